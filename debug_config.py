@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import copy
+
 def minimal_config():
     """Minimal tier configuration for testing"""
     return {
@@ -224,7 +226,7 @@ def minimal_config():
 
 def core_config(minimal_config):
     """Core tier configuration for testing"""
-    config = minimal_config.copy()
+    config = copy.deepcopy(minimal_config)
     config['tier'] = 'core'
     config['features']['cascade'] = True
     config['sections']['prd']['competitive_analysis'] = True
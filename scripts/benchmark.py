@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Stable Flow Rendering Benchmarks
+
+Generates synthetic project configurations at several scales for every tier
+and measures cold start, template compilation, render throughput and peak
+memory of the template processing engine. Each case runs in a fresh
+interpreter so cold start and peak RSS are measured in isolation. Results are
+written as JSON so runs can be compared across commits.
+"""
+
+import copy
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import click
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+
+TIERS = ('minimal', 'core', 'advanced')
+DEFAULT_SIZES = '10,100,1000,10000,100000'
+
+# Run in a fresh interpreter to time a CLI-style cold start: interpreter startup,
+# importing the engine and every module it loads, and building a processor
+COLD_START_CODE = (
+    "import sys; from pathlib import Path; sys.path.insert(0, sys.argv[1]); "
+    "from process_templates import TemplateProcessor; "
+    "TemplateProcessor(Path(sys.argv[2]))"
+)
+
+# Repeated items scaled to the benchmark size, with the item used when the
+# base example config has none to clone
+SCALED_LISTS: Dict[str, Dict[str, Any]] = {
+    'features_list': {
+        'id': 'F001',
+        'name': 'Feature',
+        'description': 'Synthetic feature',
+        'priority': 'High',
+        'status': 'Not Started',
+        'epic': 'Core',
+        'story_points': 5,
+        'assignee': 'Team',
+        'start_date': '2024-12-09',
+        'due_date': '2024-12-23',
+        'dependencies': 'None',
+        'acceptance_criteria': 'Given a user, When they act, Then it works',
+        'tdd_section_link': 'TDD-1',
+        'notes': 'None',
+    },
+    'prd.features': {
+        'name': 'Feature',
+        'priority': 'High',
+        'status': 'Planned',
+        'description': 'Synthetic feature',
+        'acceptance_criteria': 'Given a user, When they act, Then it works',
+    },
+    'prd.personas': {
+        'name': 'Persona',
+        'demographics': 'Developers, 25-45',
+        'pain_points': 'Slow docs',
+        'journey_map': 'Discover, adopt, expand',
+    },
+    'technical_design.api.endpoints': {
+        'path': '/api/v1/items',
+        'method': 'GET',
+        'description': 'List items',
+        'request_body': 'N/A',
+        'response': 'Item[]',
+        'status_codes': '200, 401',
+    },
+    'prd.risks.technical': {
+        'name': 'Risk',
+        'description': 'Synthetic technical risk',
+        'probability': 'Medium',
+        'impact': 'High',
+        'mitigation': 'Monitor',
+    },
+    'prd.risks.business': {
+        'name': 'Risk',
+        'description': 'Synthetic business risk',
+        'probability': 'Low',
+        'impact': 'Medium',
+        'mitigation': 'Review',
+    },
+}
+
+# Metrics compared across runs, and whether higher values are better
+COMPARED_METRICS = {
+    'cold_start_seconds': False,
+    'compile_seconds': False,
+    'docs_per_second': True,
+    'mb_per_second': True,
+    'peak_rss_mb': False,
+}
+
+
+def synthetic_config(tier: str, size: int) -> Dict[str, Any]:
+    """Build a config for a tier from its example, every scaled list at size items"""
+    import yaml
+
+    with open(
+        PROJECT_ROOT / 'examples' / f'{tier}-project-config.yaml', 'r', encoding='utf-8'
+    ) as f:
+        config = yaml.safe_load(f)
+
+    for path, default_item in SCALED_LISTS.items():
+        *parents, key = path.split('.')
+        node = config
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        existing = node.get(key)
+        item = (
+            existing[0]
+            if isinstance(existing, list) and existing and isinstance(existing[0], dict)
+            else default_item
+        )
+        node[key] = [_numbered(item, index) for index in range(1, size + 1)]
+    return config
+
+
+def _numbered(item: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Copy an item, making its id and name unique"""
+    numbered = copy.copy(item)
+    if 'id' in numbered:
+        numbered['id'] = f"F{index:06d}"
+    if 'name' in numbered:
+        numbered['name'] = f"{item['name']} {index}"
+    return numbered
+
+
+def measure_cold_start(repeats: int) -> float:
+    """Best time for a fresh interpreter to import the engine and build a processor"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-c', COLD_START_CODE, str(SCRIPT_DIR), str(PROJECT_ROOT)],
+            check=True,
+            cwd=str(PROJECT_ROOT),
+        )
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_case(tier: str, size: int, repeats: int) -> Dict[str, Any]:
+    """Measure one (tier, size) case; meant to run in a fresh interpreter"""
+    import resource
+
+    cold_start = measure_cold_start(repeats)
+    sys.path.insert(0, str(SCRIPT_DIR))
+    from process_templates import TemplateProcessor
+    processor = TemplateProcessor(PROJECT_ROOT)
+
+    config = synthetic_config(tier, size)
+    template_names = processor.render_plan(config).names
+
+    start = time.perf_counter()
+    processor.warm_templates(template_names)
+    compile_seconds = time.perf_counter() - start
+
+    documents = 0
+    output_bytes = 0
+    errors = set()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        # Shared derived data is computed once per configuration per run, as in
+        # the engine
+        context = processor.render_context(config)
+        for template_name in template_names:
+            result = processor.render_job(0, template_name, context)
+            if result.error:
+                errors.add(template_name)
+            elif result.content:
+                documents += 1
+                output_bytes += len(result.content.encode('utf-8'))
+    render_seconds = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = (
+        peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+    )
+
+    return {
+        'tier': tier,
+        'size': size,
+        'templates': len(template_names),
+        'failed_templates': sorted(errors),
+        'repeats': repeats,
+        'cold_start_seconds': cold_start,
+        'compile_seconds': compile_seconds,
+        'render_seconds': render_seconds,
+        'documents': documents,
+        'output_bytes': output_bytes,
+        'docs_per_second': documents / render_seconds if render_seconds else 0.0,
+        'mb_per_second': output_bytes / render_seconds / 1e6 if render_seconds else 0.0,
+        'peak_rss_mb': peak_rss_mb,
+    }
+
+
+def run_case_subprocess(tier: str, size: int, repeats: int) -> Dict[str, Any]:
+    """Run one case in a fresh interpreter and return its measurements"""
+    completed = subprocess.run(
+        [
+            sys.executable,
+            str(Path(__file__).resolve()),
+            '--run-case',
+            tier,
+            str(size),
+            '--repeats',
+            str(repeats),
+        ],
+        capture_output=True,
+        text=True,
+        cwd=str(PROJECT_ROOT),
+    )
+    if completed.returncode != 0:
+        raise click.ClickException(
+            f"Benchmark case {tier}/{size} failed:\n{completed.stderr}"
+        )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            text=True,
+            cwd=str(PROJECT_ROOT),
+        )
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Print metric changes against a baseline run and return the regressions"""
+    previous = {
+        (case['tier'], case['size']): case for case in baseline.get('results', [])
+    }
+    regressions = []
+    for case in results:
+        before = previous.get((case['tier'], case['size']))
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), case.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            label = f"{case['tier']}/{case['size']} {metric}"
+            click.echo(f"  {label:<42} {old:12.4f} -> {new:12.4f} ({change:+6.1f}%)")
+            if worse > threshold:
+                regressions.append(f"{label} regressed by {worse:.1f}%")
+    return regressions
+
+
+@click.command()
+@click.option('--tiers', default=','.join(TIERS), show_default=True,
+              help='Comma-separated tiers to benchmark')
+@click.option('--sizes', default=DEFAULT_SIZES, show_default=True,
+              help='Comma-separated item counts for features, personas, endpoints '
+                   'and risks')
+@click.option('--repeats', default=3, type=click.IntRange(min=1), show_default=True,
+              help='Render passes and cold starts per case')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, path_type=Path),
+              default=Path('benchmark-results.json'), show_default=True,
+              help='Results file')
+@click.option('--compare', 'baseline_path',
+              type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help='Previous results file to compare against')
+@click.option('--threshold', default=10.0, show_default=True,
+              help='Percent change that counts as a regression when comparing')
+@click.option('--run-case', 'case', nargs=2, hidden=True,
+              help='Run a single tier/size case and print its JSON')
+def main(
+    tiers: str,
+    sizes: str,
+    repeats: int,
+    output: Path,
+    baseline_path: Optional[Path],
+    threshold: float,
+    case: Optional[tuple],
+):
+    """Benchmark the Stable Flow rendering engine"""
+    if case:
+        tier, size = case
+        print(json.dumps(run_case(tier, int(size), repeats)))
+        return
+
+    results = []
+    for tier in [t.strip() for t in tiers.split(',') if t.strip()]:
+        for size in [int(s) for s in sizes.split(',') if s.strip()]:
+            case = run_case_subprocess(tier, size, repeats)
+            results.append(case)
+            failed = (
+                f" ({len(case['failed_templates'])} templates failed)"
+                if case['failed_templates']
+                else ""
+            )
+            click.echo(
+                f"{tier:<9} {size:>7} items: cold {case['cold_start_seconds']:.3f}s, "
+                f"compile {case['compile_seconds']:.3f}s, "
+                f"{case['docs_per_second']:.1f} docs/s, "
+                f"{case['mb_per_second']:.2f} MB/s, "
+                f"peak RSS {case['peak_rss_mb']:.1f} MB{failed}"
+            )
+
+    import jinja2
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'jinja2': jinja2.__version__,
+        },
+        'results': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    click.echo(f"Wrote {output}")
+
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        commit = baseline.get('meta', {}).get('commit')
+        click.echo(f"Compared with {baseline_path} (commit {commit}):")
+        regressions = compare(results, baseline, threshold)
+        for regression in regressions:
+            click.echo(f"REGRESSION: {regression}", err=True)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
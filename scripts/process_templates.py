@@ -4,95 +4,2922 @@ Stable Flow Template Processing Engine
 
 This script processes Jinja2 templates based on project configuration
 to generate customized documentation for different project tiers.
+
+Only the standard library and click are imported at module load. Jinja2,
+PyYAML and rich, and the heavier standard modules, are imported where they
+are first needed, so `--help` and other short invocations start quickly.
 """
 
+from __future__ import annotations
+
 import os
+import re
 import sys
-import yaml
+import time
+import hashlib
+import importlib.util
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager, nullcontext
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
 import json
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, Any, Optional
-from jinja2 import Environment, FileSystemLoader, TemplateNotFound
+from datetime import date, datetime
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 import click
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
-console = Console()
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+
+class ConsoleOutput:
+    """Console messages and progress, with rich loaded only when it is used
+
+    Messages use rich markup. In plain mode they are printed without markup
+    and progress bars are skipped. Plain mode is the default when stdout is
+    not a terminal (pre-commit hooks, CI) or rich is not installed. In
+    summary-only mode, per-file detail lines are dropped and only totals and
+    errors are printed.
+    """
+
+    MARKUP = re.compile(r'\[/?(?:red|green|yellow|blue|dim)\]')
+
+    def __init__(self, plain: Optional[bool] = None, summary_only: bool = False):
+        self._plain = plain
+        self._console = None
+        self.summary_only = summary_only
+
+    @property
+    def plain(self) -> bool:
+        if self._plain is None:
+            self._plain = (
+                not sys.stdout.isatty() or importlib.util.find_spec('rich') is None
+            )
+        return self._plain
+
+    @plain.setter
+    def plain(self, value: bool) -> None:
+        self._plain = value
+
+    @property
+    def rich_console(self) -> Any:
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console()
+        return self._console
+
+    def print(self, message: str) -> None:
+        if self.plain:
+            print(self.MARKUP.sub('', message))
+        else:
+            self.rich_console.print(message)
+
+    def detail(self, message: str) -> None:
+        """Print a per-file line, unless only summaries are wanted"""
+        if not self.summary_only:
+            self.print(message)
+
+    @contextmanager
+    def progress(self, description: str, total: int) -> Iterator[ProgressTask]:
+        """A spinner for a task of total steps, or a no-op in plain mode"""
+        if self.plain:
+            yield ProgressTask(None, None)
+            return
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=self.rich_console,
+        ) as progress:
+            yield ProgressTask(progress, progress.add_task(description, total=total))
+
+
+class ProgressTask:
+    """Handle for updating one ConsoleOutput.progress task"""
+
+    __slots__ = ('_progress', '_task')
+
+    def __init__(self, progress: Any, task: Any):
+        self._progress = progress
+        self._task = task
+
+    def update(self, description: str) -> None:
+        if self._progress is not None:
+            self._progress.update(self._task, description=description)
+
+    def advance(self) -> None:
+        if self._progress is not None:
+            self._progress.advance(self._task)
+
+
+console = ConsoleOutput()
+
+CONFIG_SUFFIXES = ('.yaml', '.yml')
+# Top-level config key naming the base configurations a config is merged onto
+EXTENDS_KEY = 'extends'
+
+# Compiled templates live in <cache dir>/templates, parsed configs in
+# <cache dir>/configs
+DEFAULT_CACHE_DIR = (
+    Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'stable-flow'
+)
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Rendered documents kept in memory by a RenderCache
+DEFAULT_RENDER_MEMORY_BYTES = 32 * 1024 * 1024
+# Rendered {% cache %} fragments kept in memory per processor
+DEFAULT_FRAGMENT_MEMORY_BYTES = 8 * 1024 * 1024
+
+# Buffer size for streamed document writes
+STREAM_BUFFER_SIZE = 256 * 1024
+
+MANIFEST_NAME = '.stable-flow-manifest.json'
+MANIFEST_VERSION = 1
+
+# Ledger of the files the engine wrote to an output directory, used to prune
+# stale outputs
+OUTPUTS_LEDGER_NAME = '.stable-flow-outputs.json'
+
+# Bump when the Environment setup changes in a way that alters compiled code
+BYTECODE_CACHE_VERSION = 2
+
+# Manifest stored inside a precompiled template bundle, and its format version
+BUNDLE_MANIFEST = 'stable-flow-bundle.json'
+BUNDLE_VERSION = 1
+
+# Columnar formats tabular documents can also be exported in, with their file
+# extensions (needs pyarrow)
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Fleet runs: configurations per work unit, attempts per unit before it is
+# reported as failed, and how long a claimed unit stays leased to its worker
+# without a renewal (workers renew after every configuration)
+DEFAULT_SHARD_SIZE = 8
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_LEASE_SECONDS = 300.0
+# How often idle fleet workers and the coordinator poll the queue
+FLEET_POLL_SECONDS = 0.5
+# Queue addresses of this form are served over TCP by the coordinator instead of
+# a SQLite file
+QUEUE_URL_SCHEME = 'tcp://'
+# Shared secret a TCP queue's coordinator and workers must agree on; required
+# to serve the queue on anything but a loopback address
+QUEUE_TOKEN_ENV = 'STABLE_FLOW_QUEUE_TOKEN'
+# Sent to a queue client whose token does not match before it is disconnected
+REFUSED_REPLY = b'{"error": "PermissionError: wrong fleet queue token"}\n'
+
+
+def load_yaml(data: Any) -> Any:
+    """Parse YAML with libyaml's C loader when available
+
+    It is many times faster than the pure-Python loader.
+    """
+    import yaml
+    return yaml.load(data, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+
+@lru_cache(maxsize=None)
+def _bytecode_cache_type() -> type:
+    """Define TemplateBytecodeCache on first use, as its base class is part of Jinja2"""
+    import jinja2
+    from jinja2 import Environment
+    from jinja2.bccache import Bucket, FileSystemBytecodeCache
+
+    class TemplateBytecodeCache(FileSystemBytecodeCache):
+        """Persistent compiled-template cache with size-based eviction
+
+        Entries are keyed on the template name, a hash of its source and the
+        Jinja/Python versions, so edited templates or upgraded interpreters never
+        load stale bytecode. When the directory grows past max_bytes the least
+        recently used entries are removed.
+        """
+
+        def __init__(self, directory: Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+            directory.mkdir(parents=True, exist_ok=True)
+            super().__init__(str(directory), 'sf-%s.cache')
+            self.max_bytes = max_bytes
+
+        def get_bucket(
+            self,
+            environment: Environment,
+            name: str,
+            filename: Optional[str],
+            source: str,
+        ) -> Bucket:
+            checksum = self.get_source_checksum(source)
+            identity = (
+                f"{BYTECODE_CACHE_VERSION}|{jinja2.__version__}|{sys.version_info[:2]}"
+                f"|{name}|{checksum}"
+            )
+            bucket = Bucket(
+                environment,
+                hashlib.sha1(identity.encode('utf-8')).hexdigest(),
+                checksum,
+            )
+            self.load_bytecode(bucket)
+            return bucket
+
+        def load_bytecode(self, bucket: Bucket) -> None:
+            super().load_bytecode(bucket)
+            if bucket.code is not None:
+                # Mark the entry as recently used for eviction
+                try:
+                    os.utime(self._get_cache_filename(bucket))
+                except OSError:
+                    pass
+
+        def dump_bytecode(self, bucket: Bucket) -> None:
+            super().dump_bytecode(bucket)
+            self.evict()
+
+        def evict(self) -> None:
+            """Remove least recently used entries until the cache fits max_bytes"""
+            evict_lru(Path(self.directory), self.pattern % '*', self.max_bytes)
+
+    TemplateBytecodeCache.__qualname__ = 'TemplateBytecodeCache'
+    return TemplateBytecodeCache
+
+
+@lru_cache(maxsize=None)
+def _fragment_cache_extension_type() -> type:
+    """Define FragmentCacheExtension on first use, as its base class is in Jinja2"""
+    from jinja2 import Environment, Undefined, nodes
+    from jinja2.ext import Extension
+    from jinja2.parser import Parser
+    from jinja2.runtime import Context
+    from jinja2.utils import missing
+
+    class FragmentCacheExtension(Extension):
+        """`{% cache key %}...{% endcache %}`: reuse a rendered template fragment
+
+        Fragments are stored under their key, a hash of their body and the
+        values the body reads, so a fragment is only reused while everything
+        it shows is unchanged. The variable paths it reads are found
+        statically as for fingerprints (see find_config_dependencies) and cut
+        to their first two levels, so a fragment showing many fields of
+        `technical_design.security` looks that section up once. The values
+        are hashed by repr, which tells 1, 1.0, True and '1' apart and is
+        cheap next to rendering. Bodies that format the current date also
+        depend on today's date. Entries live in the environment's
+        `fragment_cache`, a bounded in-memory LRU the processor shares across
+        every render of a batch. Like a macro body, variables set inside the
+        block stay local to it.
+        """
+
+        tags = {'cache'}
+
+        def __init__(self, environment: Environment):
+            super().__init__(environment)
+            environment.extend(fragment_cache=None)
+
+        def parse(self, parser: Parser) -> Any:
+            lineno = next(parser.stream).lineno
+            key = parser.parse_expression()
+            body = parser.parse_statements(('name:endcache',), drop_needle=True)
+            fragment = nodes.Template(body).set_environment(self.environment)
+            paths = tuple(
+                sorted(
+                    {
+                        tuple(path.split('.')[:2])
+                        for path in find_config_dependencies(fragment)
+                        if path.split('.', 1)[0] not in self.environment.globals
+                    }
+                )
+            )
+            uses_now = any(
+                node.name == 'strftime' for node in fragment.find_all(nodes.Filter)
+            )
+            args = [
+                key,
+                nodes.Const(content_hash(repr(body))),
+                nodes.Const(paths),
+                nodes.Const(uses_now),
+                nodes.DerivedContextReference(),
+            ]
+            return nodes.CallBlock(
+                self.call_method('_render_fragment', args), [], [], body
+            ).set_lineno(lineno)
+
+        def _render_fragment(
+            self,
+            key: Any,
+            body_hash: str,
+            paths: Tuple[Tuple[str, ...], ...],
+            uses_now: bool,
+            context: Context,
+            caller: Callable[[], str],
+        ) -> str:
+            cache = self.environment.fragment_cache
+            if cache is None:
+                return caller()
+            values: List[Any] = [key, body_hash]
+            for head, *rest in paths:
+                value = context.resolve_or_missing(head)
+                if rest and value is not missing:
+                    value = value.get(rest[0], missing) if isinstance(value, Mapping) \
+                        else getattr(value, rest[0], missing)
+                values.append(
+                    MISSING_VALUE
+                    if value is missing or isinstance(value, Undefined)
+                    else value
+                )
+            if uses_now:
+                values.append(datetime.now().date().isoformat())
+            fragment_key = content_hash(repr(values))
+            content = cache.get(fragment_key)
+            if content is None:
+                content = caller()
+                cache.put(fragment_key, content)
+            return content
+
+    FragmentCacheExtension.__qualname__ = 'FragmentCacheExtension'
+    # Compiled templates look the extension up by identifier, which would otherwise
+    # differ between `python process_templates.py` and importing the module
+    FragmentCacheExtension.identifier = 'stable_flow.FragmentCacheExtension'
+    return FragmentCacheExtension
+
+
+def __getattr__(name: str) -> Any:
+    if name == 'TemplateBytecodeCache':
+        return _bytecode_cache_type()
+    if name == 'FragmentCacheExtension':
+        return _fragment_cache_extension_type()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def evict_lru(directory: Path, pattern: str, max_bytes: int) -> None:
+    """Delete the oldest files matching pattern until their total size fits max_bytes"""
+    entries = []
+    for entry in directory.glob(pattern):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries, key=lambda item: item[0]):
+        if total <= max_bytes:
+            break
+        try:
+            entry.unlink()
+        except OSError:
+            continue
+        total -= size
+
+
+class ConfigCache:
+    """Persistent cache of parsed configuration files
+
+    Entries are pickles keyed on the resolved path, size, mtime and content
+    hash of the YAML file, so repeat runs skip YAML parsing entirely. The
+    directory must only be writable by the user, as entries are unpickled.
+    """
+
+    PATTERN = 'cfg-%s.pickle'
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        import threading
+
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Size of the on-disk store, measured on the first store
+        self._disk_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _entry_path(self, config_path: Path, data: bytes) -> Path:
+        stat = config_path.stat()
+        digest = hashlib.sha256(data).hexdigest()
+        identity = f"{config_path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{digest}"
+        return self.directory / (
+            self.PATTERN % hashlib.sha1(identity.encode('utf-8')).hexdigest()
+        )
+
+    def load(self, config_path: Path, data: bytes) -> Any:
+        """Return the parsed config for data, parsing and storing it on a miss"""
+        entry = self._entry_path(config_path, data)
+        import pickle
+        import tempfile
+
+        try:
+            with open(entry, 'rb') as f:
+                config = pickle.load(f)
+            os.utime(entry)
+            return config
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+        config = load_yaml(data)
+        fd, temp_name = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with open(fd, 'wb') as f:
+            pickle.dump(config, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        os.replace(temp_name, entry)
+        # Only scan the directory once, and again after evicting, not on every store
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(
+                    path.stat().st_size
+                    for path in self.directory.glob(self.PATTERN % '*')
+                )
+            else:
+                self._disk_bytes += size
+            if self._disk_bytes > self.max_bytes:
+                evict_lru(self.directory, self.PATTERN % '*', self.max_bytes)
+                self._disk_bytes = None
+        return config
+
+    def clear(self) -> None:
+        with self._lock:
+            self._disk_bytes = None
+        for entry in self.directory.glob(self.PATTERN % '*'):
+            try:
+                entry.unlink()
+            except OSError:
+                pass
+
+
+VALID_TIERS = ('minimal', 'core', 'advanced', 'custom')
+
+# Required in every configuration, in addition to the template's
+# validation.required_fields
+BASE_REQUIRED_FIELDS = ('project', 'tier', 'features', 'sections', 'templates',
+                        'project.name', 'project.author', 'project.version')
+
+# Template groups searched when checking tier template requirements
+TEMPLATE_GROUPS = ('core', 'advanced', 'operations')
+
+# Leaves whose value in the config template is a string accept any scalar,
+# since YAML turns unquoted dates and versions into other types
+SCALAR_TYPES = (str, int, float, date)
+
+
+class RenderCache:
+    """Content-addressed cache of rendered documents
+
+    Keys hash a document's fingerprint: its template and included sources and
+    the values at the config paths they read. Projects that share those values
+    share entries, so identical renders across a batch, or across runs, skip
+    Jinja entirely. A size-bounded in-memory LRU sits in front of an optional
+    on-disk store capped at max_bytes with LRU eviction. Safe to share between
+    threads.
+    """
+
+    PATTERN = 'doc-%s.txt'
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        memory_max_bytes: int = DEFAULT_RENDER_MEMORY_BYTES,
+    ):
+        import threading
+
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        # Larger documents are neither kept nor stored
+        self.max_entry_bytes = memory_max_bytes // 4
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        # Documents by key, with their UTF-8 size in bytes
+        self._memory: OrderedDict[str, Tuple[str, int]] = OrderedDict()
+        self._memory_bytes = 0
+        # Size of the on-disk store, measured on the first store
+        self._disk_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def hits(self) -> int:
+        return self.stats['memory_hits'] + self.stats['disk_hits']
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached document for key, or None on a miss"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return entry[0]
+
+        if self.directory is not None:
+            path = self.directory / (self.PATTERN % key)
+            try:
+                data = path.read_bytes()
+                content = data.decode('utf-8')
+                os.utime(path)
+            except (OSError, UnicodeDecodeError):
+                content = None
+            if content is not None:
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                    self._remember(key, content, len(data))
+                return content
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, key: str, content: str) -> None:
+        """Store a rendered document in memory and, with a directory, on disk"""
+        data = content.encode('utf-8')
+        if len(data) > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._remember(key, content, len(data))
+        if self.directory is None:
+            return
+
+        import tempfile
+
+        fd, temp_name = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with open(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_name, self.directory / (self.PATTERN % key))
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(
+                    entry.stat().st_size
+                    for entry in self.directory.glob(self.PATTERN % '*')
+                )
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.max_bytes:
+                evict_lru(self.directory, self.PATTERN % '*', self.max_bytes)
+                self._disk_bytes = None
+
+    def _remember(self, key: str, content: str, size: int) -> None:
+        """Add to the in-memory LRU, counting size bytes; the caller holds the lock"""
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous[1]
+        self._memory[key] = (content, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def merge_stats(self, stats: Dict[str, int]) -> None:
+        """Add counters recorded by another process's cache"""
+        with self._lock:
+            for name, count in stats.items():
+                self.stats[name] += count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._disk_bytes = None
+        if self.directory is not None:
+            for entry in self.directory.glob(self.PATTERN % '*'):
+                try:
+                    entry.unlink()
+                except OSError:
+                    pass
+
+
+class ConfigError(Exception):
+    """Configuration could not be loaded"""
+
+
+class ValidationIssue:
+    """One problem found while validating a configuration"""
+
+    __slots__ = ('path', 'message')
+
+    def __init__(self, path: str, message: str):
+        self.path = path
+        self.message = message
+
+    def to_dict(self) -> Dict[str, str]:
+        return {'path': self.path, 'message': self.message}
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}" if self.path else self.message
+
+
+class ConfigValidationError(ConfigError):
+    """Configuration failed schema validation; carries every issue found"""
+
+    def __init__(self, issues: List[ValidationIssue], source: Optional[Path] = None):
+        self.issues = issues
+        self.source = source
+        where = f" in {source}" if source else ""
+        super().__init__(
+            f"{len(issues)} validation error(s){where}: "
+            + "; ".join(str(i) for i in issues)
+        )
+
+
+class ConfigSchema:
+    """Declarative configuration schema compiled into a flat list of checks
+
+    The schema is derived from templates/config/project-config-template.yaml:
+    rendering it with no variables yields every known key with its default,
+    whose type becomes the expected type. Its `validation` block supplies the
+    required fields and per-tier template requirements. validate() runs every
+    check in one pass and returns all issues instead of stopping at the first.
+    """
+
+    def __init__(self, defaults: Dict[str, Any], rules: Dict[str, Any]):
+        self.required = sorted(
+            set(BASE_REQUIRED_FIELDS) | set(rules.get('required_fields', []))
+        )
+        self.tier_requirements = rules.get('tier_requirements', {})
+        self.type_checks: List[Tuple[Tuple[str, ...], str, tuple, str]] = []
+        self._compile(defaults, ())
+
+    @classmethod
+    def from_template(cls, template_path: Path) -> 'ConfigSchema':
+        """Build the schema from the project config template, or from the base rules
+
+        The base rules are used when the template is missing.
+        """
+        try:
+            source = template_path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return cls({}, {})
+        from jinja2 import Environment
+
+        defaults = load_yaml(Environment().from_string(source).render()) or {}
+        rules = defaults.pop('validation', {}) or {}
+        return cls(defaults, rules)
+
+    def _compile(self, node: Dict[str, Any], prefix: Tuple[str, ...]) -> None:
+        for key, value in node.items():
+            path = prefix + (key,)
+            dotted = '.'.join(path)
+            if isinstance(value, dict):
+                self.type_checks.append((path, dotted, (Mapping,), 'a mapping'))
+                self._compile(value, path)
+            elif isinstance(value, bool):
+                self.type_checks.append((path, dotted, (bool,), 'a boolean'))
+            elif isinstance(value, (int, float)):
+                self.type_checks.append((path, dotted, (int, float), 'a number'))
+            elif isinstance(value, list):
+                self.type_checks.append((path, dotted, (list, tuple), 'a list'))
+            elif value is not None:
+                self.type_checks.append((path, dotted, SCALAR_TYPES, 'a scalar value'))
+
+    @staticmethod
+    def _lookup(config: Any, path: Tuple[str, ...]) -> Any:
+        value = config
+        for key in path:
+            if not isinstance(value, Mapping) or key not in value:
+                return MISSING_VALUE
+            value = value[key]
+        return value
+
+    def validate(
+        self, config: Any, paths: Optional[Set[Tuple[str, ...]]] = None
+    ) -> List[ValidationIssue]:
+        """Check a parsed configuration, returning every issue found
+
+        With paths, only the values at those config paths are type checked;
+        the rest of the configuration comes from an already checked base.
+        """
+        if not isinstance(config, Mapping):
+            return [ValidationIssue('', 'configuration must be a mapping')]
+
+        issues = []
+        for dotted in self.required:
+            if self._lookup(config, tuple(dotted.split('.'))) is MISSING_VALUE:
+                issues.append(ValidationIssue(dotted, 'required field is missing'))
+
+        issues.extend(self.check_types(config, paths))
+
+        tier = config.get('tier')
+        if 'tier' in config and tier not in VALID_TIERS:
+            issues.append(
+                ValidationIssue(
+                    'tier',
+                    f"invalid tier '{tier}', must be one of: {', '.join(VALID_TIERS)}",
+                )
+            )
+        issues.extend(self._check_tier_templates(config, tier))
+        return issues
+
+    def check_types(
+        self, config: Any, paths: Optional[Set[Tuple[str, ...]]] = None
+    ) -> List[ValidationIssue]:
+        """Type check the known keys of a configuration, or only those at paths"""
+        issues = []
+        for path, dotted, types, description in self.type_checks:
+            if paths is not None and path not in paths:
+                continue
+            value = self._lookup(config, path)
+            if value is MISSING_VALUE or value is None:
+                continue
+            if not isinstance(value, types) or (
+                isinstance(value, bool) and bool not in types
+            ):
+                issues.append(
+                    ValidationIssue(
+                        dotted, f"expected {description}, got {type(value).__name__}"
+                    )
+                )
+        return issues
+
+    def _check_tier_templates(
+        self, config: Mapping, tier: Any
+    ) -> List[ValidationIssue]:
+        requirements = (
+            self.tier_requirements.get(tier) if isinstance(tier, str) else None
+        )
+        templates = config.get('templates')
+        if not requirements or not isinstance(templates, Mapping):
+            return []
+
+        enabled = {}
+        for group in TEMPLATE_GROUPS:
+            selected = templates.get(group)
+            if isinstance(selected, Mapping):
+                for key, value in selected.items():
+                    enabled[key] = (f"templates.{group}.{key}", value)
+
+        issues = []
+        for key in requirements.get('required_templates', []):
+            if key in enabled and enabled[key][1] is False:
+                issues.append(
+                    ValidationIssue(
+                        enabled[key][0],
+                        f"the {tier} tier always includes this template",
+                    )
+                )
+        minimum = requirements.get('min_templates')
+        if (
+            minimum
+            and sum(1 for _, value in enabled.values() if value is True) < minimum
+        ):
+            issues.append(
+                ValidationIssue(
+                    'templates',
+                    f"the {tier} tier requires at least {minimum} enabled template(s)",
+                )
+            )
+        return issues
+
+
+def merge_configs(base: Mapping, overlay: Mapping) -> Dict[str, Any]:
+    """Deep-merge an overlay onto a base configuration, returning a new tree
+
+    Mappings are merged key by key in the base's order, with the overlay's
+    new keys after. Any other overlay value, lists and null included,
+    replaces the base's. The base is copied, never modified or shared, so it
+    can be merged again; the overlay's values are used as they are.
+    """
+    merged = {}
+    for key, value in base.items():
+        if key not in overlay:
+            merged[key] = _copy_tree(value)
+        elif isinstance(value, Mapping) and isinstance(overlay[key], Mapping):
+            merged[key] = merge_configs(value, overlay[key])
+        else:
+            merged[key] = overlay[key]
+    for key, value in overlay.items():
+        if key not in merged:
+            merged[key] = value
+    return merged
+
+
+def _copy_tree(value: Any) -> Any:
+    """Copy the mappings and lists of parsed YAML, much faster than copy.deepcopy"""
+    if isinstance(value, dict):
+        return {key: _copy_tree(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_tree(item) for item in value]
+    return value
+
+
+def mapping_paths(
+    config: Mapping, prefix: Tuple[str, ...] = ()
+) -> Set[Tuple[str, ...]]:
+    """Every key path in a configuration's nested mappings"""
+    paths = set()
+    for key, value in config.items():
+        path = prefix + (key,)
+        paths.add(path)
+        if isinstance(value, Mapping):
+            paths |= mapping_paths(value, path)
+    return paths
+
+
+def file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """A file's modification time and size, or None when it cannot be read"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def config_value(config: Any, path: str) -> Any:
+    """Value at a dotted config path, or None when any part of it is missing"""
+    value = config
+    for key in path.split('.'):
+        if not isinstance(value, Mapping) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def output_directory(config: Mapping) -> Path:
+    """The output directory a configuration names; `output` may be missing or null"""
+    return Path((config.get('output') or {}).get('directory', 'docs'))
+
+
+class TableColumn:
+    """One column of a tabular document: header, row field, placeholder and condition"""
+
+    __slots__ = ('header', 'field', 'default', 'when')
+
+    def __init__(self, entry: Mapping):
+        self.header: str = entry['header']
+        self.field: str = entry['field']
+        # Written when a row lacks the field; {index} is the 1-based row number
+        self.default: str = str(entry.get('default', ''))
+        # Dotted config path that must be true for the column to be included
+        self.when: Optional[str] = entry.get('when')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class TableSpec:
+    """A document written row by row through the csv module instead of a Jinja template
+
+    Rows come from the first of the `rows` config paths holding a list, and
+    columns whose `when` flag is false are left out. Quoting is handled by the
+    csv writer, so commas, quotes and newlines in values stay in their cell.
+    """
+
+    __slots__ = ('rows_from', 'columns', 'hash')
+
+    def __init__(self, entry: Mapping):
+        rows = entry.get('rows') or ()
+        self.rows_from = (rows,) if isinstance(rows, str) else tuple(rows)
+        self.columns = [TableColumn(column) for column in entry.get('columns') or ()]
+        if not self.rows_from or not self.columns:
+            raise ValueError("a table needs rows and columns")
+        self.hash = content_hash(self.to_dict())
+
+    @property
+    def dependencies(self) -> List[str]:
+        """Config paths the table reads"""
+        return sorted(
+            set(self.rows_from)
+            | {column.when for column in self.columns if column.when}
+        )
+
+    def columns_for(self, config: Mapping) -> List[TableColumn]:
+        return [
+            column
+            for column in self.columns
+            if not column.when or config_value(config, column.when)
+        ]
+
+    def rows(self, config: Mapping) -> Sequence:
+        for path in self.rows_from:
+            rows = config_value(config, path)
+            if isinstance(rows, (list, FrozenList)):
+                return rows
+        return []
+
+    def records(self, config: Mapping) -> Iterator[List[str]]:
+        """The header row, then one list of cell values per row"""
+        columns = self.columns_for(config)
+        yield [column.header for column in columns]
+        # Hoisted out of the row loop, which dominates for large backlogs
+        cells = [
+            (column.field, column.default, '{index}' in column.default)
+            for column in columns
+        ]
+        empty: Dict[str, Any] = {}
+        for index, row in enumerate(self.rows(config), 1):
+            get = row.get if isinstance(row, Mapping) else empty.get
+            yield [str(value) if (value := get(field)) is not None
+                   else default.replace('{index}', str(index)) if numbered else default
+                   for field, default, numbered in cells]
+
+    def generate(self, config: Mapping) -> Iterator[str]:
+        """CSV text in chunks of about STREAM_BUFFER_SIZE characters"""
+        import csv
+        import io
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        for record in self.records(config):
+            writer.writerow(record)
+            if buffer.tell() >= STREAM_BUFFER_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'rows': list(self.rows_from),
+            'columns': [column.to_dict() for column in self.columns],
+        }
+
+
+class TemplateSpec:
+    """One template declared in the registry"""
+
+    __slots__ = (
+        'key',
+        'name',
+        'title',
+        'source',
+        'output',
+        'format',
+        'group',
+        'tiers',
+        'optional',
+        'depends',
+        'requires',
+        'table',
+    )
+
+    def __init__(self, key: str, entry: Mapping):
+        self.key = key
+        # Tabular documents have no source file; they are named after their output
+        self.source: Optional[str] = entry.get('source')
+        # Logical template name used throughout the engine, e.g. prd-template
+        self.name = Path(self.source or entry['output']).stem
+        self.title: str = entry.get('title', key.replace('_', ' ').title())
+        self.output: str = entry.get('output', f"{self.name}.md")
+        self.format: str = entry.get('format', 'markdown')
+        self.group: str = entry.get('group', 'core')
+        self.tiers = tuple(entry.get('tiers') or ())
+        self.optional = tuple(entry.get('optional') or ())
+        self.depends = tuple(entry.get('depends') or ())
+        self.requires = tuple(entry.get('requires') or ())
+        # Tabular documents are written by the csv writer rather than rendered
+        # from source
+        self.table = TableSpec(entry['table']) if entry.get('table') else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['table'] = self.table.to_dict() if self.table is not None else None
+        return data
+
+
+class RenderPlan:
+    """The documents one configuration renders, resolved once and executed by the engine
+
+    documents are in registry order, each after the templates it depends on.
+    Documents whose required config sections are missing are listed in
+    skipped with the reason instead of being rendered.
+    """
+
+    __slots__ = ('tier', 'documents', 'skipped')
+
+    def __init__(
+        self, tier: Any, documents: List[TemplateSpec], skipped: Dict[str, str]
+    ):
+        self.tier = tier
+        self.documents = documents
+        self.skipped = skipped
+
+    @property
+    def names(self) -> List[str]:
+        return [spec.name for spec in self.documents]
+
+
+class TemplateRegistry:
+    """Tier membership, formats, dependencies and required sections of every template
+
+    Loaded from templates/registry.yaml. Plans are memoized on the inputs that
+    decide them (the tier, the enabled template flags and which required
+    sections are present), so a batch of similar configs resolves each plan once.
+    """
+
+    def __init__(self, specs: List[TemplateSpec]):
+        self.specs: Dict[str, TemplateSpec] = {spec.key: spec for spec in specs}
+        self.by_name: Dict[str, TemplateSpec] = {spec.name: spec for spec in specs}
+        self._plans: Dict[tuple, RenderPlan] = {}
+        for spec in specs:
+            unknown = [key for key in spec.depends if key not in self.specs]
+            if unknown:
+                raise ConfigError(
+                    f"Template {spec.key} depends on unknown template(s): "
+                    f"{', '.join(unknown)}"
+                )
+        # Reject dependency cycles up front rather than on the first plan that hits one
+        self._order(list(self.specs))
+
+    @classmethod
+    def load(cls, path: Path) -> 'TemplateRegistry':
+        try:
+            data = load_yaml(path.read_bytes()) or {}
+        except FileNotFoundError:
+            raise ConfigError(f"Template registry not found: {path}") from None
+        entries = data.get('templates') if isinstance(data, Mapping) else None
+        if not isinstance(entries, Mapping):
+            raise ConfigError(
+                f"Invalid template registry {path}: missing 'templates' mapping"
+            )
+        specs = []
+        for key, entry in entries.items():
+            if not isinstance(entry, Mapping) or not (
+                entry.get('source') or entry.get('table')
+            ):
+                raise ConfigError(
+                    f"Invalid template registry {path}: {key} has no source or table"
+                )
+            try:
+                specs.append(TemplateSpec(key, entry))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ConfigError(
+                    f"Invalid template registry {path}: {key}: {e}"
+                ) from None
+        return cls(specs)
+
+    def plan(self, config: Mapping) -> RenderPlan:
+        """Resolve the documents a configuration renders"""
+        tier = config.get('tier')
+        enabled = frozenset(self._enabled(config))
+        present = frozenset(
+            section
+            for spec in self.specs.values()
+            for section in spec.requires
+            if section in config
+        )
+        key = (tier, enabled, present)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = self._resolve(tier, enabled, present)
+        return plan
+
+    def _enabled(self, config: Mapping) -> Iterator[str]:
+        """Keys of templates whose templates.<group>.<key> flag is true"""
+        templates = config.get('templates')
+        if not isinstance(templates, Mapping):
+            return
+        for spec in self.specs.values():
+            group = templates.get(spec.group)
+            if isinstance(group, Mapping) and group.get(spec.key) is True:
+                yield spec.key
+
+    def _resolve(self, tier: Any, enabled: frozenset, present: frozenset) -> RenderPlan:
+        selected = [
+            key
+            for key, spec in self.specs.items()
+            if tier in spec.tiers
+            or (key in enabled and (tier == 'custom' or tier in spec.optional))
+        ]
+        documents = []
+        skipped = {}
+        for spec in self._order(selected):
+            missing = [section for section in spec.requires if section not in present]
+            if missing:
+                skipped[spec.name] = f"needs config section(s): {', '.join(missing)}"
+            else:
+                documents.append(spec)
+        return RenderPlan(tier, documents, skipped)
+
+    def _order(self, keys: List[str]) -> List[TemplateSpec]:
+        """keys and everything they depend on, each after its dependencies"""
+        ordered: List[TemplateSpec] = []
+        done: Set[str] = set()
+
+        def add(key: str, chain: Tuple[str, ...]) -> None:
+            if key in done:
+                return
+            if key in chain:
+                raise ConfigError(
+                    f"Template dependency cycle: {' -> '.join(chain + (key,))}"
+                )
+            for dependency in self.specs[key].depends:
+                add(dependency, chain + (key,))
+            done.add(key)
+            ordered.append(self.specs[key])
+
+        for key in keys:
+            add(key, ())
+        return ordered
+
+
+def _count_items(config: Mapping, *paths: str) -> int:
+    return sum(len(items) for items in (config_value(config, path) for path in paths)
+               if isinstance(items, (list, FrozenList)))
+
+
+def build_cascade_context(
+    config: Mapping, plan: RenderPlan, registry: TemplateRegistry
+) -> Dict[str, Any]:
+    """Derived data shared by every document of one configuration
+
+    Templates see it as `cascade`:
+
+    - documents: per registry key, its title, output file, source template and
+      whether the render plan of this configuration includes it (planned).
+      A planned document can still fail to render; that is only known after
+      the context is built, while documents render from it
+    - features: the rows of the features table
+    - counts: features and story points overall and by status, priority and
+      epic, plus the sizes of the other repeated sections
+
+    Built from plain dicts and lists so fingerprints can hash what templates read.
+    """
+    planned = {spec.key for spec in plan.documents}
+    documents = {
+        spec.key: {
+            'title': spec.title,
+            'file': spec.output,
+            'template': (
+                f"templates/source/{spec.source}"
+                if spec.source
+                else 'templates/registry.yaml'
+            ),
+            'planned': spec.key in planned,
+        }
+        for spec in registry.specs.values()
+    }
+
+    features_spec = registry.specs.get('features_csv')
+    features = (
+        features_spec.table.rows(config)
+        if features_spec is not None and features_spec.table
+        else []
+    )
+    story_points = 0
+    by_status: Dict[str, int] = defaultdict(int)
+    by_priority: Dict[str, int] = defaultdict(int)
+    by_epic: Dict[str, Dict[str, int]] = {}
+    for feature in features:
+        if not isinstance(feature, Mapping):
+            continue
+        points = feature.get('story_points')
+        points = (
+            int(points)
+            if isinstance(points, int) or (isinstance(points, str) and points.isdigit())
+            else 0
+        )
+        story_points += points
+        by_status[str(feature.get('status', 'Unknown'))] += 1
+        by_priority[str(feature.get('priority', 'Unknown'))] += 1
+        epic = by_epic.setdefault(
+            str(feature.get('epic', 'Unassigned')), {'features': 0, 'story_points': 0}
+        )
+        epic['features'] += 1
+        epic['story_points'] += points
+
+    return {
+        'documents': documents,
+        'features': features,
+        'counts': {
+            'documents': len(plan.documents),
+            'features': len(features),
+            'story_points': story_points,
+            'by_status': dict(by_status),
+            'by_priority': dict(by_priority),
+            'by_epic': by_epic,
+            'mvp_features': _count_items(config, 'prd.mvp_features'),
+            'post_mvp_features': _count_items(config, 'prd.post_mvp_features'),
+            'personas': _count_items(config, 'prd.personas'),
+            'endpoints': _count_items(config, 'technical_design.api.endpoints'),
+            'risks': _count_items(config, 'prd.risks.technical', 'prd.risks.business'),
+        },
+    }
+
+
+class ConfigRunResult:
+    """Outcome of generating one configuration in a batch run"""
+
+    def __init__(self, config_path: Path, output_dir: Path):
+        self.config_path = config_path
+        self.output_dir = output_dir
+        self.documents: List[Path] = []
+        # Documents skipped because their inputs have not changed
+        self.up_to_date: List[Path] = []
+        self.seconds = 0.0
+        self.error: Optional[str] = None
+        # Per-template render errors, keyed by template name
+        self.template_errors: Dict[str, str] = {}
+        # Files written, found unchanged and pruned (see OutputWriter), and the
+        # pruned paths
+        self.output_stats: Dict[str, int] = {'written': 0, 'unchanged': 0, 'removed': 0}
+        self.removed: List[Path] = []
+        # Hash of the config file and its bases (see
+        # TemplateProcessor.load_config_with_key)
+        self.config_key: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def content_hash(data: Any) -> str:
+    """Stable SHA-256 of text, bytes or JSON-compatible data"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    elif not isinstance(data, bytes):
+        data = json.dumps(
+            data, sort_keys=True, default=_json_default, separators=(',', ':')
+        ).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    """JSON form of frozen config nodes; other unknown values hash as their string"""
+    if isinstance(value, FROZEN_TYPES):
+        return value.thaw()
+    return str(value)
+
+
+# Placeholder hashed for config paths a template reads but the config lacks
+MISSING_VALUE = '<missing>'
+
+
+def _attribute_chain(node: Any) -> Optional[List[str]]:
+    """Resolve a chain like sections.prd['x'] to ['sections', 'prd', 'x'], or None"""
+    from jinja2 import nodes
+
+    chain: List[str] = []
+    while True:
+        if isinstance(node, nodes.Getattr):
+            chain.append(node.attr)
+        elif isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const) \
+                and isinstance(node.arg.value, str):
+            chain.append(node.arg.value)
+        elif isinstance(node, nodes.Name):
+            chain.append(node.name)
+            return chain[::-1]
+        else:
+            return None
+        node = node.node
+
+
+def find_config_dependencies(ast: Any) -> List[str]:
+    """Statically find the dotted config paths a parsed template reads
+
+    A reference such as `sections.prd.competitive_analysis` records that full
+    path, while method calls like `prd.glossary.items()` record the object they
+    are called on. Only names the template does not assign itself count, so
+    loop variables and `set` targets are ignored. Paths covered by a shorter
+    recorded prefix are dropped.
+    """
+    from jinja2 import meta, nodes
+
+    undeclared = meta.find_undeclared_variables(ast)
+    paths: Set[tuple] = set()
+
+    def visit(node: Any) -> None:
+        if isinstance(node, nodes.Call) and isinstance(node.node, nodes.Getattr):
+            # Method call: depend on the object, then visit the arguments
+            chain = _attribute_chain(node.node.node)
+            if chain is not None:
+                if chain[0] in undeclared:
+                    paths.add(tuple(chain))
+                for child in node.iter_child_nodes(exclude=('node',)):
+                    visit(child)
+                return
+        if isinstance(node, (nodes.Getattr, nodes.Getitem, nodes.Name)):
+            chain = _attribute_chain(node)
+            if chain is not None:
+                if chain[0] in undeclared:
+                    paths.add(tuple(chain))
+                return
+        for child in node.iter_child_nodes():
+            visit(child)
+
+    visit(ast)
+    minimal = [
+        path
+        for path in paths
+        if not any(path[:n] in paths for n in range(1, len(path)))
+    ]
+    return sorted('.'.join(path) for path in minimal)
+
+
+def config_slice(config: Mapping, paths: Iterable[str]) -> Dict[str, Any]:
+    """Values at the given dotted paths, stopping early at non-mapping values"""
+    values: Dict[str, Any] = {}
+    for path in paths:
+        value: Any = config
+        for key in path.split('.'):
+            if not isinstance(value, Mapping):
+                break
+            if key not in value:
+                value = MISSING_VALUE
+                break
+            value = value[key]
+        values[path] = value
+    return values
+
+
+class FrozenMapping(Mapping):
+    """Base of the immutable mapping nodes of a frozen configuration (see freeze_config)
+
+    Nodes hash by structure, so equal subtrees are equal dictionary keys, and
+    `digest` is the content hash of a node, computed once and reused by
+    every fingerprint that covers it.
+    """
+
+    __slots__ = ('_hash', '_digest')
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self) -> int:
+        try:
+            return self._hash
+        except AttributeError:
+            object.__setattr__(self, '_hash', hash(frozenset(self.items())))
+            return self._hash
+
+    @property
+    def digest(self) -> str:
+        try:
+            return self._digest
+        except AttributeError:
+            object.__setattr__(self, '_digest', content_hash(self))
+            return self._digest
+
+    def thaw(self) -> Dict[Any, Any]:
+        """This level as a plain dict; values stay frozen"""
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return repr(self.thaw())
+
+
+class FrozenConfig(FrozenMapping):
+    """A frozen config section: a dict of interned keys to frozen values
+
+    Keys also read as attributes, so Jinja resolves `project.name` on the
+    first lookup instead of after a failed attribute lookup as on a dict.
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: Dict[Any, Any]):
+        object.__setattr__(self, '_data', data)
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._data[key]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def thaw(self) -> Dict[Any, Any]:
+        return dict(self._data)
+
+    def __reduce__(self) -> tuple:
+        return FrozenConfig, (self._data,)
+
+
+class FrozenRecord(FrozenMapping):
+    """A frozen list item, such as a feature, endpoint or risk
+
+    Each field layout gets its own subclass (see _record_type) with one slot
+    per field, so items hold their values without a per-item dict or keys,
+    and templates read fields as plain attributes.
+    """
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    _fieldset: frozenset = frozenset()
+    _setters: Tuple[Callable[[Any, Any], None], ...] = ()
+
+    def __init__(self, values: Iterable[Any]):
+        for setter, value in zip(self._setters, values):
+            setter(self, value)
+
+    def __getitem__(self, key: Any) -> Any:
+        if key in self._fieldset:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._fieldset
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return getattr(self, key) if key in self._fieldset else default
+
+    def thaw(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self._fields}
+
+    def __reduce__(self) -> tuple:
+        return _frozen_record, (
+            self._fields,
+            tuple(getattr(self, name) for name in self._fields),
+        )
+
+
+# Names list items cannot use as record slots, as they would hide the record's
+# own attributes
+_RESERVED_FIELDS = frozenset(dir(FrozenRecord))
+
+
+@lru_cache(maxsize=1024)
+def _record_type(fields: Tuple[Any, ...]) -> Optional[type]:
+    """The FrozenRecord subclass for one field layout
+
+    None when the keys cannot be slot names.
+    """
+    if not all(type(field) is str and field.isidentifier() and not field.startswith('_')
+               and field not in _RESERVED_FIELDS for field in fields):
+        return None
+    record_type = type(
+        'FrozenRecord',
+        (FrozenRecord,),
+        {'__slots__': fields, '_fields': fields, '_fieldset': frozenset(fields)},
+    )
+    # Slot descriptors' setters, as records refuse ordinary attribute assignment
+    record_type._setters = tuple(
+        record_type.__dict__[field].__set__ for field in fields
+    )
+    return record_type
+
+
+def _frozen_record(fields: Tuple[str, ...], values: Tuple[Any, ...]) -> FrozenRecord:
+    return _record_type(fields)(values)
+
+
+class FrozenList(Sequence):
+    """A frozen config list, holding its items in a tuple and printed like a list"""
+
+    __slots__ = ('_items', '_hash', '_digest')
+
+    def __init__(self, items: Iterable[Any]):
+        object.__setattr__(self, '_items', tuple(items))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("FrozenList is immutable")
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return FrozenList(self._items[index])
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._items)
+
+    def __reversed__(self) -> Iterator[Any]:
+        return reversed(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self._items
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, FrozenList):
+            return self._items == other._items
+        if isinstance(other, (list, tuple)):
+            return self._items == tuple(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        try:
+            return self._hash
+        except AttributeError:
+            object.__setattr__(self, '_hash', hash(self._items))
+            return self._hash
+
+    @property
+    def digest(self) -> str:
+        try:
+            return self._digest
+        except AttributeError:
+            object.__setattr__(self, '_digest', content_hash(self))
+            return self._digest
+
+    def thaw(self) -> List[Any]:
+        """The items as a plain list; they stay frozen"""
+        return list(self._items)
+
+    def __repr__(self) -> str:
+        return repr(self.thaw())
+
+    def __reduce__(self) -> tuple:
+        return FrozenList, (self._items,)
+
+
+FROZEN_TYPES = (FrozenMapping, FrozenList)
+
+# Immutable values stored in frozen configs as they are
+_ATOMIC_TYPES = frozenset({str, int, float, bool, type(None), bytes, date, datetime})
+
+
+def freeze_config(config: Any) -> Any:
+    """An immutable, compact copy of a parsed configuration
+
+    Mappings become FrozenConfig nodes with interned keys, mappings that are
+    list items become slotted FrozenRecords, lists become FrozenLists and
+    sets frozensets. Objects reachable along several paths, such as a
+    feature in both the features list and the cascade feature index, are
+    frozen once and shared. Frozen nodes pass through unchanged, so
+    freezing is cheap to repeat. Jinja reads the result like the original
+    dicts and lists; it never needs a defensive copy, and forked pool
+    workers share it instead of unpickling a copy per job.
+    """
+    return _freeze(config, {}, False)
+
+
+def _freeze(value: Any, memo: Dict[int, Any], item: bool) -> Any:
+    kind = type(value)
+    if kind in _ATOMIC_TYPES:
+        return value
+    # Exact type checks first, as the ABC checks dominate on large configs
+    if kind is not dict and kind is not list and isinstance(value, FROZEN_TYPES):
+        return value
+    frozen = memo.get(id(value))
+    if frozen is not None:
+        return frozen
+    if kind is dict or isinstance(value, Mapping):
+        values = [child if type(child) in _ATOMIC_TYPES else _freeze(child, memo, False)
+                  for child in value.values()]
+        record_type = _record_type(tuple(value)) if item else None
+        if record_type is not None:
+            frozen = record_type(values)
+        else:
+            frozen = FrozenConfig({sys.intern(key) if type(key) is str else key: child
+                                   for key, child in zip(value, values)})
+    elif kind is list or isinstance(value, tuple):
+        frozen = FrozenList(
+            [
+                child if type(child) in _ATOMIC_TYPES else _freeze(child, memo, True)
+                for child in value
+            ]
+        )
+    elif isinstance(value, (set, frozenset)):
+        frozen = frozenset(_freeze(child, memo, False) for child in value)
+    else:
+        return value
+    memo[id(value)] = frozen
+    return frozen
+
+
+def config_digest(value: Any) -> Any:
+    """A frozen node's cached digest, or the value itself for scalars and plain data"""
+    return value.digest if isinstance(value, FROZEN_TYPES) else value
+
+
+class RenderManifest:
+    """Record of the inputs each document in an output directory was rendered from
+
+    Stored as MANIFEST_NAME inside the output directory. Only entries recorded
+    or kept during the current run are saved, so documents whose templates are
+    no longer rendered drop out of the manifest.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.path = output_dir / MANIFEST_NAME
+        self.previous: Dict[str, Any] = {}
+        self.entries: Dict[str, Any] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.previous = data.get('documents', {})
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def is_fresh(
+        self, template_name: str, fingerprint: Dict[str, Any], output_path: Path
+    ) -> bool:
+        """Whether the document was rendered from the same inputs and still exists"""
+        entry = self.previous.get(template_name)
+        if (
+            entry is None
+            or entry.get('fingerprint') != fingerprint
+            or not output_path.exists()
+        ):
+            return False
+        self.entries[template_name] = entry
+        return True
+
+    def record(
+        self, template_name: str, fingerprint: Dict[str, Any], output_path: Path
+    ) -> None:
+        self.entries[template_name] = {
+            'fingerprint': fingerprint,
+            'output': output_path.name,
+        }
+
+    def save(self) -> None:
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'version': MANIFEST_VERSION, 'documents': self.entries},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+
+
+@lru_cache(maxsize=None)
+def new_file_mode() -> int:
+    """Permissions the umask gives new files
+
+    Applied to files created through mkstemp, which makes them private.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+class OutputWriter:
+    """Writes one run's files into an output directory
+
+    Every file is compared with the existing one first and left untouched,
+    mtime included, when the bytes are the same. Changed files are written to
+    a temp file in the directory and renamed into place, so readers never see
+    a partial file. With fsync, the written files and the directory are
+    synced once in finish() rather than per file.
+
+    Names written, kept or claimed during the run are recorded in the
+    OUTPUTS_LEDGER_NAME ledger. With prune, finish() deletes files listed by
+    the previous run's ledger that nothing claimed this time, such as the
+    documents of templates that are no longer rendered. Files the engine did
+    not write are never deleted.
+    """
+
+    def __init__(self, output_dir: Path, fsync: bool = False, prune: bool = False):
+        self.output_dir = output_dir
+        self.fsync = fsync
+        self.prune = prune
+        self.stats: Dict[str, int] = {'written': 0, 'unchanged': 0, 'removed': 0}
+        self.removed: List[Path] = []
+        # Output names produced or deliberately left in place this run
+        self.claimed: Set[str] = set()
+        self._written: List[Path] = []
+
+    def record(self, name: str, changed: bool) -> Path:
+        """Count a file written (or found unchanged) by this writer or a pool worker"""
+        output_path = self.output_dir / name
+        self.claimed.add(name)
+        if changed:
+            self.stats['written'] += 1
+            self._written.append(output_path)
+        else:
+            self.stats['unchanged'] += 1
+        return output_path
+
+    def claim(self, name: str) -> None:
+        """Keep an existing output that was not rewritten, e.g. after a failed render"""
+        self.claimed.add(name)
+
+    def write(self, name: str, data: bytes) -> Path:
+        """Write bytes unless the file already holds exactly them"""
+        output_path = self.output_dir / name
+        try:
+            if (
+                output_path.stat().st_size == len(data)
+                and output_path.read_bytes() == data
+            ):
+                return self.record(name, changed=False)
+        except FileNotFoundError:
+            pass
+
+        def produce(temp_name: str) -> int:
+            with open(temp_name, 'wb') as f:
+                f.write(data)
+            return len(data)
+        return self.write_file(name, produce, compare=False)
+
+    def write_chunks(self, name: str, chunks: Iterable[str]) -> Optional[Path]:
+        """Stream text chunks through a buffered temp file; None when they are empty"""
+        def produce(temp_name: str) -> int:
+            size = 0
+            with open(
+                temp_name,
+                'w',
+                encoding='utf-8',
+                newline='',
+                buffering=STREAM_BUFFER_SIZE,
+            ) as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    f.write(chunk)
+            return size
+        return self.write_file(name, produce)
+
+    def write_file(
+        self, name: str, produce: Callable[[str], Any], compare: bool = True
+    ) -> Optional[Path]:
+        """Have produce write a temp file, then move it into place
+
+        Nothing is moved when the temp file is empty or unchanged.
+
+        produce gets the temp file name (a binary file object for an
+        ArchiveWriter) and returns how much it wrote (falsy for nothing, in
+        which case nothing is written), or None when unknown.
+        """
+        import filecmp
+        import tempfile
+
+        output_path = self.output_dir / name
+        fd, temp_name = tempfile.mkstemp(
+            dir=self.output_dir, prefix=f".{output_path.name}.", suffix='.tmp'
+        )
+        os.close(fd)
+        os.chmod(temp_name, new_file_mode())
+        try:
+            size = produce(temp_name)
+            if size is not None and not size:
+                os.unlink(temp_name)
+                return None
+            if (
+                compare
+                and output_path.exists()
+                and filecmp.cmp(temp_name, output_path, shallow=False)
+            ):
+                os.unlink(temp_name)
+                return self.record(name, changed=False)
+            os.replace(temp_name, output_path)
+        except BaseException:
+            try:
+                os.unlink(temp_name)
+            except OSError:
+                pass
+            raise
+        return self.record(name, changed=True)
+
+    def finish(self) -> None:
+        """Prune stale outputs, sync written files when asked, and save the ledger"""
+        ledger_path = self.output_dir / OUTPUTS_LEDGER_NAME
+        try:
+            with open(ledger_path, 'r', encoding='utf-8') as f:
+                previous = set(json.load(f).get('outputs', []))
+        except (FileNotFoundError, ValueError, AttributeError):
+            previous = set()
+
+        kept = self.claimed
+        if self.prune:
+            for name in sorted(previous - self.claimed):
+                output_path = self.output_dir / name
+                # Names come from a file in the output directory; never follow
+                # them out of it
+                if Path(name).name != name:
+                    continue
+                try:
+                    output_path.unlink()
+                except FileNotFoundError:
+                    continue
+                self.stats['removed'] += 1
+                self.removed.append(output_path)
+        else:
+            kept = self.claimed | {
+                name for name in previous if (self.output_dir / name).exists()
+            }
+
+        if kept != previous:
+            with open(ledger_path, 'w', encoding='utf-8') as f:
+                json.dump({'outputs': sorted(kept)}, f, indent=2)
+
+        if self.fsync and (self._written or self.removed):
+            for output_path in self._written:
+                fd = os.open(output_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            # Make the renames and deletions durable too (not possible on Windows)
+            if hasattr(os, 'O_DIRECTORY'):
+                fd = os.open(self.output_dir, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+
+class OutputArchive:
+    """One tar, compressed tar or zip file that a run's documents are streamed into
+
+    The format follows the file name: .zip, .tar, .tar.gz/.tgz or
+    .tar.zst/.tzst (zstd needs Python 3.14 or the zstandard package).
+    Documents go straight into the archive with no per-document temp files.
+    Zip members are compressed chunk by chunk as they are rendered. A tar
+    header needs the member's size up front, so each tar member is held in
+    memory once, and the compressed stream is still written sequentially.
+    Each output directory of the run becomes a prefix inside the archive (see
+    writer). The archive is written next to its destination and renamed into
+    place by close(), so readers never see a partial one; abort() discards it.
+    """
+
+    SUFFIXES = {
+        '.zip': 'zip',
+        '.tar': 'tar',
+        '.tar.gz': 'gz',
+        '.tgz': 'gz',
+        '.tar.zst': 'zst',
+        '.tzst': 'zst',
+    }
+
+    def __init__(self, path: Path):
+        import tempfile
+
+        name = path.name.lower()
+        kind = next(
+            (kind for suffix, kind in self.SUFFIXES.items() if name.endswith(suffix)),
+            None,
+        )
+        if kind is None:
+            raise ConfigError(
+                f"Archive output must end in {', '.join(self.SUFFIXES)}: {path}"
+            )
+        self.path = path
+        self.kind = kind
+        # Documents added so far, and their member names
+        self.members = 0
+        self._names: Set[str] = set()
+        self._mtime = int(time.time())
+        self._zip: Any = None
+        self._tar: Any = None
+        self._compressor: Any = None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._temp_name = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix='.tmp'
+        )
+        self._file = open(fd, 'wb')
+        os.chmod(self._temp_name, new_file_mode())
+        try:
+            if kind == 'zip':
+                import zipfile
+                self._zip = zipfile.ZipFile(
+                    self._file, 'w', compression=zipfile.ZIP_DEFLATED
+                )
+            else:
+                import tarfile
+                if kind == 'zst':
+                    self._compressor = _zstd_writer(self._file)
+                self._tar = tarfile.open(
+                    fileobj=self._compressor or self._file,
+                    mode='w|gz' if kind == 'gz' else 'w|',
+                    format=tarfile.PAX_FORMAT,
+                )
+        except BaseException:
+            self.abort()
+            raise
+
+    def writer(self, prefix: Path) -> 'ArchiveWriter':
+        """A writer for the documents of one output directory, stored under prefix"""
+        return ArchiveWriter(self, prefix)
+
+    def add(self, name: str, data: bytes) -> None:
+        """Store one complete member"""
+        self._claim(name)
+        if self.kind == 'zip':
+            self._zip.writestr(self._zip_info(name), data)
+        else:
+            import io
+            import tarfile
+
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = self._mtime
+            info.mode = 0o644
+            self._tar.addfile(info, io.BytesIO(data))
+        self.members += 1
+
+    def add_chunks(self, name: str, chunks: Iterable[bytes]) -> None:
+        """Store one member from chunks, streamed into zip members as they arrive"""
+        if self.kind != 'zip':
+            self.add(name, b''.join(chunks))
+            return
+        self._claim(name)
+        with self._zip.open(self._zip_info(name), 'w', force_zip64=True) as member:
+            for chunk in chunks:
+                member.write(chunk)
+        self.members += 1
+
+    def _claim(self, name: str) -> None:
+        """Refuse a second member with the same name
+
+        tar and zip would both keep it silently.
+        """
+        if name in self._names:
+            raise FileExistsError(f"Archive {self.path} already holds {name}")
+        self._names.add(name)
+
+    def _zip_info(self, name: str) -> Any:
+        import zipfile
+
+        info = zipfile.ZipInfo(name, date_time=time.localtime(self._mtime)[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        return info
+
+    def close(self) -> None:
+        """Finish the archive and move it into place"""
+        try:
+            if self.kind == 'zip':
+                self._zip.close()
+            else:
+                self._tar.close()
+                if self._compressor is not None:
+                    self._compressor.close()
+            self._file.close()
+            os.replace(self._temp_name, self.path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        """Discard the partly written archive"""
+        # Detach the zip or tar stream first, or it would try to finish itself into the
+        # closed file when collected
+        if self._zip is not None:
+            self._zip.fp = None
+        if self._tar is not None:
+            self._tar.closed = self._tar.fileobj.closed = True
+        if self._compressor is not None:
+            try:
+                self._compressor.close()
+            except Exception:
+                pass
+        self._file.close()
+        try:
+            os.unlink(self._temp_name)
+        except OSError:
+            pass
+
+
+def _zstd_writer(fileobj: Any) -> Any:
+    """A zstd-compressing writer over fileobj that leaves fileobj open when closed"""
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.ZstdFile(fileobj, 'w')
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ConfigError(".tar.zst archives need the zstandard package: "
+                          "pip install 'stable-flow[archive]'") from None
+    return zstandard.ZstdCompressor().stream_writer(fileobj, closefd=False)
+
+
+class ArchiveWriter(OutputWriter):
+    """Writes one output directory's files into an OutputArchive, under a prefix
+
+    Documents and table exports are written as through an OutputWriter. A
+    new archive holds no previous output, so every file counts as written and
+    nothing is compared or pruned. Returned paths name the member inside the
+    archive, e.g. docs.tar.gz/<prefix>/<name>.
+    """
+
+    def __init__(self, archive: OutputArchive, prefix: Path):
+        super().__init__(archive.path / prefix)
+        self.archive = archive
+        self.prefix = prefix
+
+    def _member(self, name: str) -> str:
+        return (self.prefix / name).as_posix()
+
+    def write(self, name: str, data: bytes) -> Path:
+        self.archive.add(self._member(name), data)
+        return self.record(name, changed=True)
+
+    def write_chunks(self, name: str, chunks: Iterable[str]) -> Optional[Path]:
+        """Stream text chunks into the archive
+
+        Returns None, with nothing stored, when they are empty.
+        """
+        import itertools
+
+        chunks = iter(chunks)
+        first = next((chunk for chunk in chunks if chunk), None)
+        if first is None:
+            return None
+        self.archive.add_chunks(
+            self._member(name),
+            (chunk.encode('utf-8') for chunk in itertools.chain((first,), chunks)),
+        )
+        return self.record(name, changed=True)
+
+    def write_file(
+        self, name: str, produce: Callable[[Any], Any], compare: bool = True
+    ) -> Optional[Path]:
+        """Have produce write into an in-memory file, then store it unless empty"""
+        import io
+
+        buffer = io.BytesIO()
+        size = produce(buffer)
+        if size is not None and not size:
+            return None
+        return self.write(name, buffer.getvalue())
+
+    def finish(self) -> None:
+        """Nothing to prune or sync; OutputArchive.close() finishes the whole archive"""
+
+
+class FileWatcher:
+    """Wait for changes to a set of files and directories
+
+    Uses watchdog (inotify on Linux) when it is installed and falls back to
+    polling mtimes otherwise. Bursts of saves are debounced: wait() returns
+    only once no further change has been seen for `debounce` seconds.
+    """
+
+    def __init__(self, paths: List[Path], interval: float = 0.5, debounce: float = 0.3):
+        self.paths = [path.resolve() for path in paths]
+        self.interval = interval
+        self.debounce = debounce
+        import threading
+
+        self._changed: Set[Path] = set()
+        self._event = threading.Event()
+        self._snapshot = self._take_snapshot()
+        self._observer = self._start_observer()
+
+    def _files(self) -> Iterable[Path]:
+        for path in self.paths:
+            if path.is_dir():
+                yield from (child for child in path.rglob('*') if child.is_file())
+            else:
+                yield path
+
+    def _take_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll(self) -> None:
+        snapshot = self._take_snapshot()
+        changed = {path for path in snapshot.keys() | self._snapshot.keys()
+                   if snapshot.get(path) != self._snapshot.get(path)}
+        self._snapshot = snapshot
+        if changed:
+            self._changed.update(changed)
+            self._event.set()
+
+    def _start_observer(self) -> Any:
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event: Any) -> None:
+                if event.is_directory:
+                    return
+                path = Path(os.fsdecode(event.src_path)).resolve()
+                if event.event_type == 'moved':
+                    # Safe-saving editors write a temp file and rename it over
+                    # the target: the destination is the file that changed, and
+                    # the temp name, gone now, is dropped
+                    watcher._changed.discard(path)
+                    path = Path(os.fsdecode(event.dest_path)).resolve()
+                watcher._changed.add(path)
+                watcher._event.set()
+
+        observer = Observer()
+        for path in self.paths:
+            observer.schedule(
+                Handler(),
+                str(path if path.is_dir() else path.parent),
+                recursive=path.is_dir(),
+            )
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    def _is_watched(self, path: Path) -> bool:
+        return any(path == watched or watched in path.parents for watched in self.paths)
+
+    def wait(self) -> Set[Path]:
+        """Block until watched files change, then return the changed paths"""
+        while True:
+            while not self._event.is_set():
+                if self._observer is None:
+                    time.sleep(self.interval)
+                    self._poll()
+                else:
+                    self._event.wait(self.interval)
+
+            # Debounce: keep collecting until the burst of saves settles
+            while self._event.is_set():
+                self._event.clear()
+                time.sleep(self.debounce)
+                if self._observer is None:
+                    self._poll()
+
+            changed = {path for path in self._changed if self._is_watched(path)}
+            self._changed.clear()
+            if changed:
+                return changed
+
+
+class StageEvent:
+    """Timing of one pipeline stage, passed to processor hooks
+
+    stage is one of load_config, validate, lookup, compile, render or write.
+    name is the template name, or the config path for config stages. size is
+    the rendered length in characters for render and the bytes written for
+    write. start is a time.perf_counter() value.
+    """
+
+    __slots__ = ('stage', 'name', 'start', 'duration', 'size', 'pid')
+
+    def __init__(self, stage: str, name: Optional[str], start: float):
+        self.stage = stage
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.size: Optional[int] = None
+        self.pid = os.getpid()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'stage': self.stage, 'name': self.name, 'start': self.start,
+                'duration': self.duration, 'size': self.size, 'pid': self.pid}
+
+
+class RunProfile:
+    """Collects stage events from a processor hook and exports them
+
+    Register with processor.add_hook(profile.record), then write the results
+    as a JSON summary or as a Chrome trace (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self):
+        self.events: List[StageEvent] = []
+
+    def record(self, event: StageEvent) -> None:
+        self.events.append(event)
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-stage and per-template totals"""
+        stages: Dict[str, Dict[str, float]] = {}
+        templates: Dict[str, Dict[str, Any]] = {}
+        for event in self.events:
+            totals = stages.setdefault(event.stage, {'count': 0, 'seconds': 0.0})
+            totals['count'] += 1
+            totals['seconds'] += event.duration
+            if event.stage in ('lookup', 'compile', 'render', 'write') and event.name:
+                template = templates.setdefault(event.name, {})
+                template[f"{event.stage}_seconds"] = (
+                    template.get(f"{event.stage}_seconds", 0.0) + event.duration
+                )
+                if event.size is not None:
+                    key = 'output_bytes' if event.stage == 'write' else 'rendered_chars'
+                    template[key] = template.get(key, 0) + event.size
+        return {'stages': stages, 'templates': templates}
+
+    def write_json(self, path: Path) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {
+                    **self.summary(),
+                    'events': [event.to_dict() for event in self.events],
+                },
+                f,
+                indent=2,
+            )
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write events in the Chrome trace event format, one track per process"""
+        origin = min((event.start for event in self.events), default=0.0)
+        trace = [{
+            'name': f"{event.stage} {event.name}" if event.name else event.stage,
+            'cat': event.stage,
+            'ph': 'X',
+            'ts': (event.start - origin) * 1e6,
+            'dur': event.duration * 1e6,
+            'pid': event.pid,
+            'tid': event.pid,
+            'args': {'name': event.name, 'size': event.size},
+        } for event in self.events]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+class RenderResult:
+    """Outcome of rendering one (config, template) job"""
+
+    __slots__ = (
+        'config_index',
+        'template_name',
+        'content',
+        'error',
+        'seconds',
+        'output_path',
+        'changed',
+        'events',
+        'cache_stats',
+        'fragment_stats',
+    )
+
+    def __init__(
+        self,
+        config_index: int,
+        template_name: str,
+        content: Optional[str] = None,
+        error: Optional[str] = None,
+        seconds: float = 0.0,
+    ):
+        self.config_index = config_index
+        self.template_name = template_name
+        self.content = content
+        self.error = error
+        self.seconds = seconds
+        # Set instead of content when the worker streamed the document to disk,
+        # with whether the file's bytes changed
+        self.output_path: Optional[Path] = None
+        self.changed = False
+        # Stage events recorded by the worker, replayed to the parent's hooks
+        self.events: List[StageEvent] = []
+        # Render and fragment cache counters recorded by the worker, merged into
+        # the parent's
+        self.cache_stats: Dict[str, int] = {}
+        self.fragment_stats: Dict[str, int] = {}
+
 
 class TemplateProcessor:
     """Main template processing class"""
-    
-    def __init__(self, project_root: Path):
+
+    def __init__(
+        self,
+        project_root: Path,
+        cache_dir: Optional[Path] = None,
+        cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        stream_output: bool = False,
+        config_cache_dir: Optional[Path] = None,
+        render_cache: bool = False,
+        render_cache_dir: Optional[Path] = None,
+        table_exports: Iterable[str] = (),
+        template_bundle: Optional[Path] = None,
+        fsync: bool = False,
+        prune: bool = True,
+    ):
         self.project_root = project_root
         self.templates_dir = project_root / "templates"
         self.source_dir = self.templates_dir / "source"
         self.config_dir = self.templates_dir / "config"
         self.output_dir = project_root / "docs"
-        
+
+        # Constructor options, reused to build identical processors in pool workers
+        self.options: Dict[str, Any] = {
+            'cache_dir': cache_dir,
+            'cache_max_bytes': cache_max_bytes,
+            'stream_output': stream_output,
+            'config_cache_dir': config_cache_dir,
+            'render_cache': render_cache,
+            'render_cache_dir': render_cache_dir,
+            'table_exports': tuple(table_exports),
+            'template_bundle': template_bundle,
+            'fsync': fsync,
+            'prune': prune,
+        }
+        self.config_cache = (
+            ConfigCache(config_cache_dir, cache_max_bytes) if config_cache_dir else None
+        )
+        # Rendered documents by fingerprint, in memory and, with render_cache_dir,
+        # on disk
+        self.render_cache = RenderCache(render_cache_dir, cache_max_bytes) \
+            if render_cache or render_cache_dir else None
+        # Rendered {% cache %} fragments, shared by every render of this processor
+        self.fragment_cache = RenderCache(
+            memory_max_bytes=DEFAULT_FRAGMENT_MEMORY_BYTES
+        )
+        self._schema: Optional[ConfigSchema] = None
+        self._registry: Optional[TemplateRegistry] = None
+        # Cumulative wall time per stage (see StageEvent) in seconds
+        self.timings: Dict[str, float] = defaultdict(float)
+        self._hooks: List[Callable[[StageEvent], None]] = []
+        # Stream rendered chunks straight to disk instead of building each
+        # document in memory
+        self.stream_output = stream_output
+        # Columnar formats (see COLUMNAR_FORMATS) every tabular document is also
+        # exported in
+        self.table_exports = tuple(table_exports)
+        # Output writing: sync written files once per output directory, and
+        # delete stale outputs
+        self.fsync = fsync
+        self.prune = prune
+        self.bytecode_cache = (
+            _bytecode_cache_type()(cache_dir, cache_max_bytes) if cache_dir else None
+        )
+
+        # Compiled templates by logical name (without extension)
+        self._templates: Dict[str, Template] = {}
+        # Template file names in the source directory, listed on first lookup
+        self._template_files: Optional[Set[str]] = None
+        # Source hashes, includes and variables by template file name
+        self._template_info: Dict[str, Dict[str, Any]] = {}
+        # Base configurations named by `extends`, by resolved path: the (path, file
+        # stamp) of every file they were read from, the merged and type-checked
+        # config, and its key (see load_config_with_key)
+        self._base_configs: Dict[
+            Path, Tuple[Tuple[Tuple[Path, Any], ...], Dict[str, Any], str]
+        ] = {}
+
         # Initialize Jinja2 environment
+        # Templates are compiled once per processor, so skip the per-lookup
+        # mtime checks that auto_reload would do
+        from jinja2 import Environment, FileSystemLoader
+
+        self.template_bundle = template_bundle
+        loader = (
+            self._load_bundle(template_bundle)
+            if template_bundle
+            else FileSystemLoader(str(self.source_dir))
+        )
         self.jinja_env = Environment(
-            loader=FileSystemLoader(str(self.source_dir)),
+            loader=loader,
             trim_blocks=True,
-            lstrip_blocks=True
+            lstrip_blocks=True,
+            auto_reload=False,
+            bytecode_cache=self.bytecode_cache,
+            extensions=[_fragment_cache_extension_type()],
         )
+        self.jinja_env.fragment_cache = self.fragment_cache
         
         # Add custom filters
         self.jinja_env.filters['strftime'] = self._strftime_filter
     
+    def _load_bundle(self, bundle_path: Path) -> Any:
+        """Loader for a bundle written by build_bundle, after checking it is current
+
+        The bundle's manifest supplies the template list and each template's
+        hash, includes and config dependencies, so neither the source
+        directory nor any template AST is read afterwards. When the sources
+        are present, their hashes must match the manifest; a bundle built by
+        another Jinja2 version is rejected as its compiled code may not run.
+        """
+        import zipfile
+
+        import jinja2
+
+        try:
+            with zipfile.ZipFile(bundle_path) as archive:
+                manifest = json.loads(archive.read(BUNDLE_MANIFEST))
+        except FileNotFoundError:
+            raise ConfigError(f"Template bundle not found: {bundle_path}") from None
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            raise ConfigError(f"Invalid template bundle {bundle_path}: {e}") from None
+
+        engine = [BUNDLE_VERSION, jinja2.__version__]
+        if manifest.get('engine') != engine:
+            raise ConfigError(
+                f"Template bundle {bundle_path} was built for "
+                f"{manifest.get('engine')}, this engine is {engine}; "
+                f"rebuild it with --build-bundle"
+            )
+        templates: Dict[str, Dict[str, Any]] = manifest['templates']
+        if self.source_dir.is_dir():
+            sources = self._list_source_files()
+            stale = sorted(set(templates).symmetric_difference(sources))
+            stale += [
+                name
+                for name in sources
+                if name in templates
+                and content_hash((self.source_dir / name).read_text(encoding='utf-8'))
+                != templates[name]['hash']
+            ]
+            if stale:
+                raise ConfigError(
+                    f"Template bundle {bundle_path} does not match templates/source "
+                    f"({', '.join(stale)}); rebuild it with --build-bundle"
+                )
+
+        self._template_info.update(templates)
+        self._template_files = set(templates)
+        return jinja2.ModuleLoader(str(bundle_path))
+
+    def _list_source_files(self) -> List[str]:
+        """Template file names under the source directory, as the loader names them"""
+        return sorted(path.relative_to(self.source_dir).as_posix()
+                      for path in self.source_dir.rglob('*') if path.is_file())
+
+    def list_templates(self) -> List[str]:
+        """File names of every template this processor can load"""
+        if self._template_files is None:
+            self._template_files = set(self.jinja_env.list_templates())
+        return sorted(self._template_files)
+
+    def build_bundle(self, bundle_path: Path) -> List[str]:
+        """Compile every source template into a zip of Python modules
+
+        The zip is loadable with template_bundle. It also holds a manifest of
+        each template's source hash and dependency analysis, used to check and
+        fingerprint it at load time. Returns the bundled template file names.
+        """
+        import tempfile
+        import zipfile
+
+        import jinja2
+
+        names = self.list_templates()
+        with self._stage('bundle', str(bundle_path)):
+            manifest = {
+                'engine': [BUNDLE_VERSION, jinja2.__version__],
+                'templates': {name: self._get_template_info(name) for name in names},
+            }
+            bundle_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(
+                dir=bundle_path.parent, prefix=f".{bundle_path.name}.", suffix='.tmp'
+            )
+            os.close(fd)
+            try:
+                self.jinja_env.compile_templates(
+                    temp_name, zip='deflated', ignore_errors=False
+                )
+                with zipfile.ZipFile(
+                    temp_name, 'a', compression=zipfile.ZIP_DEFLATED
+                ) as archive:
+                    archive.writestr(
+                        BUNDLE_MANIFEST, json.dumps(manifest, indent=2, sort_keys=True)
+                    )
+                os.replace(temp_name, bundle_path)
+            except BaseException:
+                try:
+                    os.unlink(temp_name)
+                except OSError:
+                    pass
+                raise
+        return names
+
     def _strftime_filter(self, value: str, format_str: str) -> str:
         """Custom filter for date formatting"""
         if value == "now":
             return datetime.now().strftime(format_str)
         return value
     
+    def add_hook(self, hook: Callable[[StageEvent], None]) -> None:
+        """Call hook with a StageEvent after every pipeline stage"""
+        self._hooks.append(hook)
+
+    def _emit(self, event: StageEvent) -> None:
+        self.timings[event.stage] += event.duration
+        for hook in self._hooks:
+            hook(event)
+
+    @contextmanager
+    def _stage(self, stage: str, name: Optional[str] = None) -> Iterator[StageEvent]:
+        """Time the enclosed block as one pipeline stage"""
+        event = StageEvent(stage, name, time.perf_counter())
+        try:
+            yield event
+        finally:
+            event.duration = time.perf_counter() - event.start
+            self._emit(event)
+
+    @property
+    def schema(self) -> ConfigSchema:
+        """The configuration schema, compiled on first use"""
+        if self._schema is None:
+            self._schema = ConfigSchema.from_template(
+                self.config_dir / "project-config-template.yaml"
+            )
+        return self._schema
+
+    @property
+    def registry(self) -> TemplateRegistry:
+        """The template registry, loaded on first use"""
+        if self._registry is None:
+            self._registry = TemplateRegistry.load(self.templates_dir / "registry.yaml")
+        return self._registry
+
+    def render_plan(self, config: Dict[str, Any]) -> RenderPlan:
+        """The documents a configuration renders, in order"""
+        return self.registry.plan(config)
+
+    def render_context(
+        self, config: Mapping, plan: Optional[RenderPlan] = None
+    ) -> FrozenConfig:
+        """The variables templates are rendered with: the frozen config and cascade
+
+        The cascade context (see build_cascade_context) is computed once per
+        configuration per run and shared by all of its documents, and the
+        whole context is frozen (see freeze_config) so renders, fingerprints
+        and pool workers share one immutable copy. A frozen context is
+        returned as is, so every render entry point can call this cheaply.
+        """
+        if isinstance(config, FrozenConfig) and 'cascade' in config:
+            return config
+        if 'cascade' not in config:
+            if plan is None:
+                plan = self.render_plan(config)
+            with self._stage('cascade'):
+                config = {
+                    **config,
+                    'cascade': build_cascade_context(config, plan, self.registry),
+                }
+        with self._stage('freeze'):
+            return freeze_config(config)
+
+    def _output_name(self, template_name: str) -> str:
+        """File name of a template's document in the output directory"""
+        spec = self.registry.by_name.get(template_name)
+        return spec.output if spec is not None else f"{template_name}.md"
+
+    def _table(self, template_name: str) -> Optional[TableSpec]:
+        """The table a tabular document is written from, or None for Jinja templates"""
+        spec = self.registry.by_name.get(template_name)
+        return spec.table if spec is not None else None
+
     def load_config(self, config_path: Path) -> Dict[str, Any]:
-        """Load and validate project configuration"""
+        """Load and validate project configuration
+
+        A configuration may be an overlay on base configurations named under
+        `extends` (see load_config_with_key). Raises ConfigError when the file
+        or a base is missing or is not valid YAML, and ConfigValidationError
+        listing every schema violation.
+        """
+        return self.load_config_with_key(config_path)[0]
+
+    def load_config_with_key(self, config_path: Path) -> Tuple[Dict[str, Any], str]:
+        """Load and validate a configuration, with a key identifying its inputs
+
+        `extends: base.yaml`, or a list of bases merged in order, deep-merges
+        the file onto its bases (see merge_configs). Base paths are relative to
+        the extending file, and bases may extend others. Each base is parsed
+        and type checked once per processor and reused while its files are
+        unchanged, so a project only costs the parse of its overlay and a copy
+        of the base; of the merged configuration, only the overlay's values are
+        type checked again.
+
+        The key hashes the file's bytes and its bases' keys. It changes when
+        the merged configuration can, without hashing the merged data, so later
+        stages can use it as a cheap cache key.
+        """
+        raw, key = self._read_config(config_path)
+        if isinstance(raw, dict) and EXTENDS_KEY in raw:
+            overlay = dict(raw)
+            base, base_keys, _ = self._merged_bases(
+                config_path, overlay.pop(EXTENDS_KEY), (config_path.resolve(),)
+            )
+            config = merge_configs(base, overlay)
+            self.validate_config(config, config_path, mapping_paths(overlay))
+            return config, content_hash([key, *base_keys])
+        self.validate_config(raw, config_path)
+        return raw, key
+
+    @property
+    def base_config_paths(self) -> List[Path]:
+        """Base configurations loaded so far through `extends`"""
+        return list(self._base_configs)
+
+    def _merged_bases(self, config_path: Path, bases: Any, chain: Tuple[Path, ...]) \
+            -> Tuple[Dict[str, Any], List[str], List[Tuple[Path, Any]]]:
+        """Merge the bases a configuration extends, with their keys and file stamps
+
+        The result may be a memoized base itself, so it must not be modified.
+        """
+        if isinstance(bases, str):
+            bases = [bases]
+        if (
+            not bases
+            or not isinstance(bases, list)
+            or not all(isinstance(name, str) for name in bases)
+        ):
+            raise ConfigError(
+                f"'{EXTENDS_KEY}' in {config_path} must be a base configuration path "
+                f"or a list of them"
+            )
+
+        merged: Optional[Dict[str, Any]] = None
+        keys = []
+        stamps: List[Tuple[Path, Any]] = []
+        for name in bases:
+            base_path = (config_path.parent / name).resolve()
+            if base_path in chain:
+                cycle = ' -> '.join(map(str, chain + (base_path,)))
+                raise ConfigError(f"Configuration extends itself: {cycle}")
+            entry = self._load_base(base_path, chain + (base_path,))
+            merged = entry[1] if merged is None else merge_configs(merged, entry[1])
+            keys.append(entry[2])
+            stamps.extend(entry[0])
+        return merged, keys, stamps
+
+    def _load_base(self, base_path: Path, chain: Tuple[Path, ...]) \
+            -> Tuple[Tuple[Tuple[Path, Any], ...], Dict[str, Any], str]:
+        """A base configuration merged onto its own bases and type checked
+
+        Memoized while none of its files change. Bases may be partial, so
+        required fields and tier rules are only checked on the configurations
+        that extend them.
+        """
+        entry = self._base_configs.get(base_path)
+        if entry is not None and all(
+            file_stamp(path) == stamp for path, stamp in entry[0]
+        ):
+            return entry
+
+        # Stamped before reading, so an edit made during the read is picked up next time
+        stamp = file_stamp(base_path)
+        if stamp is None:
+            raise ConfigError(f"Base configuration not found: {base_path}")
+        raw, key = self._read_config(base_path)
+        if not isinstance(raw, dict):
+            raise ConfigValidationError(
+                [ValidationIssue('', 'configuration must be a mapping')], base_path
+            )
+        stamps = [(base_path, stamp)]
+        config = raw
+        if EXTENDS_KEY in raw:
+            overlay = dict(raw)
+            parent, parent_keys, parent_stamps = self._merged_bases(
+                base_path, overlay.pop(EXTENDS_KEY), chain
+            )
+            config = merge_configs(parent, overlay)
+            key = content_hash([key, *parent_keys])
+            stamps.extend(parent_stamps)
+
+        with self._stage('validate', str(base_path)):
+            issues = self.schema.check_types(config)
+        if issues:
+            raise ConfigValidationError(issues, base_path)
+        entry = (tuple(stamps), config, key)
+        self._base_configs[base_path] = entry
+        return entry
+
+    def _read_config(self, config_path: Path) -> Tuple[Any, str]:
+        """Parse a configuration file, returning its data and the hash of its bytes"""
+        import yaml
+
+        try:
+            with self._stage('load_config', str(config_path)) as event:
+                with open(config_path, 'rb') as f:
+                    data = f.read()
+                event.size = len(data)
+                if self.config_cache is not None:
+                    config = self.config_cache.load(config_path, data)
+                else:
+                    config = load_yaml(data)
+        except FileNotFoundError:
+            raise ConfigError(f"Configuration file not found: {config_path}") from None
+        except yaml.YAMLError as e:
+            raise ConfigError(
+                f"Invalid YAML in configuration file {config_path}: {e}"
+            ) from None
+        return config, hashlib.sha256(data).hexdigest()
+
+    def validate_config(self, config: Any, source: Optional[Path] = None,
+                        paths: Optional[Set[Tuple[str, ...]]] = None) -> None:
+        """Validate configuration against the schema, raising ConfigValidationError
+
+        With paths, only the values at those paths are type checked (see
+        ConfigSchema.validate).
+        """
+        with self._stage('validate', str(source) if source else None):
+            issues = self.schema.validate(config, paths)
+        if issues:
+            raise ConfigValidationError(issues, source)
+
+    def _load_template(self, template_name: str) -> Template:
+        """Get a compiled template, compiling it on first use"""
+        template = self._templates.get(template_name)
+        if template is None:
+            with self._stage('lookup', template_name):
+                filename = self._resolve_template_file(template_name)
+            with self._stage('compile', template_name):
+                template = self.jinja_env.get_template(filename)
+            self._templates[template_name] = template
+        return template
+
+    def _resolve_template_file(self, template_name: str) -> str:
+        """Find a template's file name from the registry, or by trying .md, then .csv"""
+        spec = self.registry.by_name.get(template_name)
+        if spec is not None and spec.source:
+            return spec.source
+        files = self.list_templates()
+        for extension in ('.md', '.csv'):
+            if f"{template_name}{extension}" in files:
+                return f"{template_name}{extension}"
+        from jinja2 import TemplateNotFound
+        raise TemplateNotFound(f"{template_name}.md")
+
+    def _get_template_info(self, filename: str) -> Dict[str, Any]:
+        """Analyze a template source once: its hash, includes and the config it reads"""
+        info = self._template_info.get(filename)
+        if info is None:
+            from jinja2 import meta, nodes
+
+            source, _, _ = self.jinja_env.loader.get_source(self.jinja_env, filename)
+            ast = self.jinja_env.parse(source)
+            info = {
+                'hash': content_hash(source),
+                'includes': sorted(
+                    name for name in meta.find_referenced_templates(ast) if name
+                ),
+                'dependencies': find_config_dependencies(ast),
+                'uses_now': any(
+                    node.name == 'strftime' for node in ast.find_all(nodes.Filter)
+                ),
+            }
+            self._template_info[filename] = info
+        return info
+
+    def template_dependencies(self, template_name: str) -> Dict[str, Any]:
+        """Config paths and template files a template depends on, includes too"""
+        table = self._table(template_name)
+        if table is not None:
+            return {
+                'template': f"registry.yaml#{self.registry.by_name[template_name].key}",
+                'hash': table.hash,
+                'includes': {},
+                'config': table.dependencies,
+                'uses_now': False,
+            }
+        filename = self._load_template(template_name).name
+        info = self._get_template_info(filename)
+        includes: Dict[str, str] = {}
+        dependencies = set(info['dependencies'])
+        uses_now = info['uses_now']
+        pending = list(info['includes'])
+        while pending:
+            include = pending.pop()
+            if include in includes:
+                continue
+            include_info = self._get_template_info(include)
+            includes[include] = include_info['hash']
+            dependencies.update(include_info['dependencies'])
+            uses_now = uses_now or include_info['uses_now']
+            pending.extend(include_info['includes'])
+
+        return {
+            'template': filename,
+            'hash': info['hash'],
+            'includes': includes,
+            'config': sorted(dependencies),
+            'uses_now': uses_now,
+        }
+
+    def dependency_map(self, template_names: Iterable[str]) -> Dict[str, Any]:
+        """Per-template config-key dependency map, suitable for dumping as JSON"""
+        return {name: self.template_dependencies(name) for name in template_names}
+
+    def document_fingerprint(
+        self, template_name: str, config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Hashes of everything a rendered document depends on
+
+        Covers the template source, every template it includes (transitively)
+        and the values at the config paths the templates read. Templates that
+        format the current date also depend on today's date.
+        """
+        dependencies = self.template_dependencies(template_name)
+        # Frozen subtrees contribute their cached digests, so a large list read
+        # by several templates is serialized once per run
+        values = {
+            path: config_digest(value)
+            for path, value in config_slice(
+                self.render_context(config), dependencies['config']
+            ).items()
+        }
+        if dependencies['uses_now']:
+            values['@today'] = datetime.now().date().isoformat()
+        return {'template': dependencies['hash'], 'includes': dependencies['includes'],
+                'config': content_hash(values)}
+
+    def _render_key(self, template_name: str, config: Dict[str, Any]) -> Optional[str]:
+        """Render cache key for a document
+
+        None when caching is off or the document cannot be fingerprinted.
+        """
+        if self.render_cache is None:
+            return None
+        fingerprint = self._try_fingerprint(template_name, config)
+        if fingerprint is None:
+            return None
+        import jinja2
+        return content_hash(
+            {'engine': [BYTECODE_CACHE_VERSION, jinja2.__version__], **fingerprint}
+        )
+
+    def _render_template(self, template_name: str, config: Dict[str, Any]) -> str:
+        """Render a template to a string, serving repeats from the render cache"""
+        config = self.render_context(config)
+        table = self._table(template_name)
+        template = self._load_template(template_name) if table is None else None
+        key = self._render_key(template_name, config)
+        with self._stage('render', template_name) as event:
+            content = self.render_cache.get(key) if key else None
+            if content is None:
+                content = (
+                    ''.join(table.generate(config))
+                    if table is not None
+                    else template.render(**config)
+                )
+                if key:
+                    self.render_cache.put(key, content)
+            event.size = len(content)
+        return content
+
+    def reload_templates(self, filenames: Iterable[str]) -> None:
+        """Forget compiled templates whose source, or any included source, changed"""
+        changed = set(filenames)
+        stale = []
+        for name, template in self._templates.items():
+            try:
+                includes = self.template_dependencies(name)['includes']
+            except Exception:
+                includes = {}
+            if template.name in changed or changed.intersection(includes):
+                stale.append(name)
+
+        for name in stale:
+            del self._templates[name]
+        for filename in changed:
+            self._template_info.pop(filename, None)
+        # Jinja's own cache would otherwise keep serving the old compiled code, and
+        # cached fragments may come from the changed templates or their includes
+        self.jinja_env.cache.clear()
+        self.fragment_cache.clear()
+        self._template_files = None
+
+    def warm_templates(self, template_names: Iterable[str]) -> None:
+        """Compile templates ahead of rendering, ignoring missing ones and tables"""
+        from jinja2 import TemplateNotFound
+
+        for template_name in template_names:
+            if self._table(template_name) is not None:
+                continue
+            try:
+                self._load_template(template_name)
+            except TemplateNotFound:
+                pass
+
+    def render_job(self, config_index: int, template_name: str, config: Dict[str, Any],
+                   stream_dir: Optional[Path] = None) -> RenderResult:
+        """Render one template, capturing errors instead of printing them
+
+        With stream_dir, the document is streamed to disk by this process and
+        only its path, and whether the file changed, is returned.
+        """
+        start = time.perf_counter()
+        result = RenderResult(config_index, template_name)
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-            
-            # Validate required fields
-            self._validate_config(config)
-            return config
-            
-        except FileNotFoundError:
-            console.print(f"[red]Error: Configuration file not found: {config_path}[/red]")
-            sys.exit(1)
-        except yaml.YAMLError as e:
-            console.print(f"[red]Error: Invalid YAML in configuration file: {e}[/red]")
-            sys.exit(1)
-    
-    def _validate_config(self, config: Dict[str, Any]) -> None:
-        """Validate configuration against schema"""
-        required_fields = ['project', 'tier', 'features', 'sections', 'templates']
+            if stream_dir is not None:
+                writer = OutputWriter(stream_dir)
+                result.output_path = self._stream_document(
+                    writer, template_name, config
+                )
+                result.changed = writer.stats['written'] > 0
+            else:
+                result.content = self._render_template(template_name, config)
+        except Exception as e:
+            result.error = self._render_error(template_name, e)
+        result.seconds = time.perf_counter() - start
+        return result
 
-        for field in required_fields:
-            if field not in config:
-                console.print(f"[red]Error: Missing required field '{field}' in configuration[/red]")
-                sys.exit(1)
+    @staticmethod
+    def _render_error(template_name: str, error: Exception) -> str:
+        """The message a failed render is recorded with in result.template_errors"""
+        from jinja2 import TemplateNotFound
 
-        # Validate project has required subfields
-        if 'name' not in config['project'] or 'author' not in config['project'] or 'version' not in config['project']:
-            console.print("[red]Error: Missing required project fields (name, author, version)[/red]")
-            sys.exit(1)
+        if isinstance(error, TemplateNotFound):
+            return f"Template not found: {template_name}.md or {template_name}.csv"
+        return f"Error processing template {template_name}: {error}"
 
-        # Validate tier
-        valid_tiers = ['minimal', 'core', 'advanced', 'custom']
-        if config['tier'] not in valid_tiers:
-            console.print(f"[red]Error: Invalid tier '{config['tier']}'. Must be one of: {valid_tiers}[/red]")
-            sys.exit(1)
-    
-    def process_template(self, template_name: str, config: Dict[str, Any]) -> Optional[str]:
+    def process_template(
+        self, template_name: str, config: Dict[str, Any]
+    ) -> Optional[str]:
         """Process a single template"""
+        from jinja2 import TemplateNotFound
+
         try:
-            # Try .md first, then .csv
-            try:
-                template = self.jinja_env.get_template(f"{template_name}.md")
-            except TemplateNotFound:
-                template = self.jinja_env.get_template(f"{template_name}.csv")
-            
-            return template.render(**config)
+            return self._render_template(template_name, config)
         except TemplateNotFound:
             console.print(f"[yellow]Warning: Template not found: {template_name}.md or {template_name}.csv[/yellow]")
             return None
@@ -100,91 +2927,1778 @@ class TemplateProcessor:
             console.print(f"[red]Error processing template {template_name}: {e}[/red]")
             return None
     
-    def generate_documents(self, config: Dict[str, Any]) -> None:
-        """Generate all documents based on configuration"""
-        tier = config['tier']
-        output_dir = Path(config.get('output', {}).get('directory', 'docs'))
+    def generate_documents(self, config: Dict[str, Any], incremental: bool = False,
+                           archive: Optional[OutputArchive] = None) -> List[Path]:
+        """Generate all documents based on configuration
+
+        Files are only rewritten when their content differs, and outputs of
+        templates no longer rendered are pruned (see OutputWriter). In
+        incremental mode, documents whose template, included templates and
+        config slice are unchanged since the last run are not even rendered.
+        With archive, the documents are streamed into it, at its top level,
+        instead of written to the output directory; incremental is ignored.
+        """
+        output_dir = Path() if archive is not None else output_directory(config)
+        result = ConfigRunResult(Path(), output_dir)
+        self._generate_into(result, config, incremental, archive)
+        report_template_errors(result)
+        return result.documents
+
+    def _writer(
+        self, output_dir: Path, archive: Optional[OutputArchive] = None
+    ) -> OutputWriter:
+        """An OutputWriter for output_dir
+
+        With archive, a writer into it under the prefix output_dir.
+        """
+        if archive is not None:
+            return archive.writer(output_dir)
+        return OutputWriter(output_dir, fsync=self.fsync, prune=self.prune)
+
+    def _generate_into(
+        self,
+        result: ConfigRunResult,
+        config: Dict[str, Any],
+        incremental: bool,
+        archive: Optional[OutputArchive] = None,
+    ) -> None:
+        """Render and write one configuration's documents, recording them on result
+
+        Template errors are recorded in result.template_errors, as pool runs
+        record them, for the caller to report once.
+        """
+        output_dir = result.output_dir
         
         # Create output directory
-        output_dir.mkdir(exist_ok=True)
+        if archive is None:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        writer = self._writer(output_dir, archive)
         
-        # Determine which templates to process based on tier
-        templates_to_process = self._get_templates_for_tier(tier, config)
-        
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-        ) as progress:
-            task = progress.add_task("Generating documents...", total=len(templates_to_process))
-            
+        # Resolve which templates to process for the tier and enabled templates
+        plan = self.render_plan(config)
+        for template_name, reason in plan.skipped.items():
+            result.template_errors[template_name] = (
+                f"Error processing template {template_name}: {reason}"
+            )
+        config = self.render_context(config, plan)
+        templates_to_process = plan.names
+        # A new archive holds no previous documents, so every one is rendered into it
+        manifest = (
+            RenderManifest(output_dir) if incremental and archive is None else None
+        )
+
+        with console.progress(
+            "Generating documents...", len(templates_to_process)
+        ) as task:
             for template_name in templates_to_process:
-                progress.update(task, description=f"Processing {template_name}...")
-                
-                content = self.process_template(template_name, config)
-                if content:
-                    output_path = output_dir / f"{template_name}.md"
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    console.print(f"[green]Generated: {output_path}[/green]")
+                task.update(f"Processing {template_name}...")
+                output_name = self._output_name(template_name)
+
+                fingerprint = None
+                if manifest is not None:
+                    fingerprint = self._try_fingerprint(template_name, config)
+                    output_path = output_dir / output_name
+                    if fingerprint and manifest.is_fresh(
+                        template_name, fingerprint, output_path
+                    ):
+                        result.up_to_date.append(
+                            writer.record(output_name, changed=False)
+                        )
+                        console.detail(f"[dim]Up to date: {output_path}[/dim]")
+                        task.advance()
+                        continue
                 
-                progress.advance(task)
-    
-    def _get_templates_for_tier(self, tier: str, config: Dict[str, Any]) -> list:
-        """Get list of templates to process based on tier and configuration"""
-        if tier == 'minimal':
-            return ['prd-template', 'technical-design-template', 'features-csv-template']
-        elif tier == 'core':
-            return [
-                'prd-template', 'technical-design-template', 'features-csv-template',
-                'development-guide-template', 'sprint-planning-template', 'sprint-template'
-            ]
-        elif tier == 'advanced':
-            return [
-                'prd-template', 'technical-design-template', 'features-csv-template',
-                'development-guide-template', 'sprint-planning-template', 'sprint-template',
-                'master-index-template', 'adr-template'
-            ]
-        elif tier == 'custom':
-            # For custom tier, use the templates specified in config
-            templates = []
-            if config.get('templates', {}).get('core', {}).get('prd', False):
-                templates.append('prd-template')
-            if config.get('templates', {}).get('core', {}).get('technical_design', False):
-                templates.append('technical-design-template')
-            # Add more as needed
-            return templates
-        
-        return []
+                # A failed render keeps the previous document rather than pruning it
+                writer.claim(output_name)
+                written = writer.stats['written']
+                try:
+                    output_path = self._render_document(writer, template_name, config)
+                except Exception as e:
+                    result.template_errors[template_name] = self._render_error(
+                        template_name, e
+                    )
+                    output_path = None
+                if output_path:
+                    result.documents.append(output_path)
+                    if fingerprint:
+                        manifest.record(template_name, fingerprint, output_path)
+                    if writer.stats['written'] > written:
+                        console.detail(f"[green]Generated: {output_path}[/green]")
+                    else:
+                        console.detail(f"[dim]Unchanged: {output_path}[/dim]")
+
+                task.advance()
+
+        if manifest is not None:
+            manifest.save()
+
+        for output_path in self.export_tables(writer, config, plan):
+            result.documents.append(output_path)
+            console.detail(f"[green]Generated: {output_path}[/green]")
+
+        self._finish_writer(result, writer)
+
+    def _finish_writer(self, result: ConfigRunResult, writer: OutputWriter) -> None:
+        with self._stage('finish', str(writer.output_dir)):
+            writer.finish()
+        result.output_stats = writer.stats
+        result.removed = writer.removed
+        for output_path in writer.removed:
+            console.detail(f"[yellow]Removed: {output_path}[/yellow]")
+
+    def export_tables(
+        self, writer: OutputWriter, config: Dict[str, Any], plan: RenderPlan
+    ) -> List[Path]:
+        """Write the plan's tabular documents in each columnar export format
+
+        Each export sits next to the CSV document with the format's extension,
+        e.g. features-csv-template.parquet, and holds the same columns as
+        string values.
+        """
+        exported = []
+        for spec in plan.documents:
+            if spec.table is None:
+                continue
+            for columnar_format in self.table_exports:
+                output_name = (
+                    Path(spec.output)
+                    .with_suffix(COLUMNAR_FORMATS[columnar_format])
+                    .name
+                )
+                records = spec.table.records(config)
+                with self._stage('export', spec.name):
+                    exported.append(
+                        writer.write_file(
+                            output_name,
+                            lambda temp_name: write_columnar(
+                                records, temp_name, columnar_format
+                            ),
+                        )
+                    )
+        return exported
+
+    def _try_fingerprint(
+        self, template_name: str, config: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Fingerprint a document, or None when its template cannot be loaded"""
+        try:
+            return self.document_fingerprint(template_name, config)
+        except Exception:
+            return None
+
+    def _render_document(
+        self, writer: OutputWriter, template_name: str, config: Dict[str, Any]
+    ) -> Optional[Path]:
+        """Render one document to disk, or None for empty output
+
+        Errors are raised to the caller.
+        """
+        if not self.stream_output:
+            content = self._render_template(template_name, config)
+            return (
+                self._write_document(writer, template_name, content)
+                if content
+                else None
+            )
+        return self._stream_document(writer, template_name, config)
+
+    def _stream_document(
+        self, writer: OutputWriter, template_name: str, config: Dict[str, Any]
+    ) -> Optional[Path]:
+        """Stream a template's output through the writer's buffered temp file
+
+        Memory use stays flat however large the document is. Returns None for
+        empty output, matching process_template, which skips empty documents.
+        Its time counts as render time, since rendering and writing are
+        interleaved. With the render cache, a hit is written out directly,
+        and a miss is stored when it is small enough to cache.
+        """
+        config = self.render_context(config)
+        table = self._table(template_name)
+        template = self._load_template(template_name) if table is None else None
+        key = self._render_key(template_name, config)
+        with self._stage('render', template_name) as event:
+            cached = self.render_cache.get(key) if key else None
+            if cached is not None:
+                return self._stream_to_file([cached], writer, template_name, event)
+            chunks = (
+                table.generate(config)
+                if table is not None
+                else template.generate(**config)
+            )
+            return self._stream_to_file(chunks, writer, template_name, event, key)
+
+    def _stream_to_file(
+        self,
+        chunks: Iterable[str],
+        writer: OutputWriter,
+        template_name: str,
+        event: StageEvent,
+        cache_key: Optional[str] = None,
+    ) -> Optional[Path]:
+        # Chunks kept for the render cache, dropped once the document is too large
+        # to cache. A character is at least one UTF-8 byte, so counting characters
+        # never drops one that fits.
+        kept: Optional[List[str]] = [] if cache_key else None
+        event.size = 0
+
+        def observed() -> Iterator[str]:
+            nonlocal kept
+            for chunk in chunks:
+                event.size += len(chunk)
+                if kept is not None:
+                    if event.size <= self.render_cache.max_entry_bytes:
+                        kept.append(chunk)
+                    else:
+                        kept = None
+                yield chunk
+
+        output_path = writer.write_chunks(self._output_name(template_name), observed())
+        if kept is not None:
+            self.render_cache.put(cache_key, ''.join(kept))
+        return output_path
+
+    def _write_document(
+        self, writer: OutputWriter, template_name: str, content: str
+    ) -> Path:
+        """Write one rendered document and return its path
+
+        An existing file with identical bytes is left untouched so its mtime
+        does not change.
+        """
+        with self._stage('write', template_name) as event:
+            data = content.encode('utf-8')
+            event.size = len(data)
+            return writer.write(self._output_name(template_name), data)
+
+    def generate_documents_parallel(
+        self,
+        config: Dict[str, Any],
+        max_workers: int = 4,
+        incremental: bool = False,
+        archive: Optional[OutputArchive] = None,
+    ) -> ConfigRunResult:
+        """Generate all documents for one configuration using a process pool"""
+        output_dir = Path() if archive is not None else output_directory(config)
+        result = ConfigRunResult(Path(), output_dir)
+        start = time.perf_counter()
+        self._generate_loaded([(result, config)], max_workers, incremental, archive)
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def generate_many(
+        self,
+        config_paths: Iterable[Path],
+        output_root: Optional[Path] = None,
+        workers: int = 1,
+        incremental: bool = False,
+        archive: Optional[OutputArchive] = None,
+        config_root: Optional[Path] = None,
+    ) -> List[ConfigRunResult]:
+        """Generate documents for many configurations in one process
+
+        Compiled templates are shared across all configurations, so each
+        template is parsed and compiled at most once per batch. When
+        output_root is given, each configuration is written to
+        output_root/<name>, where name is the config's path relative to
+        config_root without its suffix (see config_output_dirs); for a flat
+        directory of configs that is the config stem. With archive, every
+        configuration is instead streamed into that one archive under the
+        prefix <name>/. With workers > 1 the (config, template) render jobs
+        are spread over a process pool. Raises ConfigError, before anything
+        is generated, when two configurations would share a name.
+        """
+        config_paths = list(config_paths)
+        names = (
+            config_output_dirs(config_paths, config_root)
+            if output_root or archive is not None
+            else []
+        )
+        results = []
+        loaded = []
+        for index, config_path in enumerate(config_paths):
+            start = time.perf_counter()
+            if archive is not None:
+                output_dir = names[index]
+            else:
+                output_dir = output_root / names[index] if output_root else None
+            result = ConfigRunResult(config_path, output_dir)
+            try:
+                config, result.config_key = self.load_config_with_key(config_path)
+                if output_dir is not None:
+                    output = config.get('output') or {}
+                    config['output'] = {**output, 'directory': str(output_dir)}
+                result.output_dir = output_directory(config)
+                if workers > 1:
+                    # Only the compact frozen context is kept until the pool runs
+                    loaded.append((result, self.render_context(config)))
+                else:
+                    self._generate_into(result, config, incremental, archive)
+            except ConfigError as e:
+                result.error = str(e)
+            result.seconds = time.perf_counter() - start
+            results.append(result)
+
+        if loaded:
+            self._generate_loaded(loaded, workers, incremental, archive)
+        return results
+
+    def _generate_loaded(
+        self,
+        loaded: List[Any],
+        workers: int,
+        incremental: bool = False,
+        archive: Optional[OutputArchive] = None,
+    ) -> None:
+        """Render (config, template) jobs over a process pool and write the outputs
+
+        Jobs are submitted and collected in (config, template) order, so the
+        written files and reported errors are the same for any worker count.
+        In incremental mode, fresh documents are filtered out before submission.
+        With archive, workers return documents to be streamed into it by this
+        process, even in stream mode.
+
+        Jobs carry only a config index: the frozen render contexts reach the
+        workers once, inherited through fork where available (see
+        _render_pool_context), or else passed to each worker's initializer.
+        """
+        import concurrent.futures
+
+        global _shared_contexts
+        jobs = []
+        contexts: List[FrozenConfig] = []
+        manifests: Dict[int, RenderManifest] = {}
+        fingerprints: Dict[Any, Dict[str, Any]] = {}
+        writers: List[OutputWriter] = []
+        if archive is not None:
+            incremental = False
+        for index, (result, config) in enumerate(loaded):
+            if archive is None:
+                result.output_dir.mkdir(parents=True, exist_ok=True)
+            writer = self._writer(result.output_dir, archive)
+            writers.append(writer)
+            if incremental:
+                manifests[index] = RenderManifest(result.output_dir)
+            plan = self.render_plan(config)
+            for template_name, reason in plan.skipped.items():
+                result.template_errors[template_name] = (
+                    f"Error processing template {template_name}: {reason}"
+                )
+            config = self.render_context(config, plan)
+            contexts.append(config)
+            for template_name in plan.names:
+                output_name = self._output_name(template_name)
+                if incremental:
+                    fingerprint = self._try_fingerprint(template_name, config)
+                    output_path = result.output_dir / output_name
+                    if fingerprint and manifests[index].is_fresh(
+                        template_name, fingerprint, output_path
+                    ):
+                        result.up_to_date.append(
+                            writer.record(output_name, changed=False)
+                        )
+                        continue
+                    if fingerprint:
+                        fingerprints[index, template_name] = fingerprint
+                writer.claim(output_name)
+                stream_dir = (
+                    result.output_dir
+                    if self.stream_output and archive is None
+                    else None
+                )
+                jobs.append((index, template_name, stream_dir))
+
+        if jobs:
+            template_names = sorted({job[1] for job in jobs})
+            chunksize = max(1, len(jobs) // (workers * 4))
+            import gc
+
+            mp_context = _render_pool_context()
+            forked = mp_context.get_start_method() == 'fork'
+            _shared_contexts = contexts
+            if forked:
+                # Keep collections in the workers from writing to, and so
+                # copying, the shared pages
+                gc.freeze()
+            try:
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=mp_context,
+                    initializer=_init_render_worker,
+                    initargs=(
+                        self.project_root,
+                        self.options,
+                        template_names,
+                        None if forked else contexts,
+                    ),
+                ) as executor:
+                    pending = executor.map(_run_render_job, jobs, chunksize=chunksize)
+                    if forked:
+                        # A fork pool starts every worker on the first submission, so
+                        # the parent's own objects can be collected again from here on
+                        gc.unfreeze()
+                    job_results = list(pending)
+            finally:
+                _shared_contexts = []
+                if forked:
+                    gc.unfreeze()
+        else:
+            job_results = []
+
+        for job_result in job_results:
+            result = loaded[job_result.config_index][0]
+            writer = writers[job_result.config_index]
+            result.seconds += job_result.seconds
+            for event in job_result.events:
+                self._emit(event)
+            if self.render_cache is not None and job_result.cache_stats:
+                self.render_cache.merge_stats(job_result.cache_stats)
+            if job_result.fragment_stats:
+                self.fragment_cache.merge_stats(job_result.fragment_stats)
+            if job_result.error:
+                result.template_errors[job_result.template_name] = job_result.error
+            elif job_result.content or job_result.output_path:
+                start = time.perf_counter()
+                if job_result.output_path is None:
+                    output_path = self._write_document(
+                        writer, job_result.template_name, job_result.content
+                    )
+                else:
+                    output_path = writer.record(
+                        job_result.output_path.name, job_result.changed
+                    )
+                result.documents.append(output_path)
+                fingerprint = fingerprints.get(
+                    (job_result.config_index, job_result.template_name)
+                )
+                if fingerprint:
+                    manifests[job_result.config_index].record(
+                        job_result.template_name, fingerprint, output_path
+                    )
+                result.seconds += time.perf_counter() - start
+
+        for manifest in manifests.values():
+            manifest.save()
+        for (result, _), writer, config in zip(loaded, writers, contexts):
+            result.documents.extend(
+                self.export_tables(writer, config, self.render_plan(config))
+            )
+            self._finish_writer(result, writer)
+
+
+def write_columnar(
+    records: Iterator[List[str]], path: Any, columnar_format: str
+) -> None:
+    """Write a header row and its records as a Parquet or Arrow IPC file
+
+    Every column is stored as strings. path is a file name, or a binary file
+    object such as an ArchiveWriter's buffer.
+    """
+    import pyarrow
+
+    header = next(records)
+    columns: List[List[str]] = [[] for _ in header]
+    for record in records:
+        for column, value in zip(columns, record):
+            column.append(value)
+    table = pyarrow.Table.from_arrays(
+        [pyarrow.array(column, type=pyarrow.string()) for column in columns],
+        names=header,
+    )
+    if columnar_format == 'parquet':
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(table, path)
+    else:
+        import pyarrow.ipc
+        # A file object passed in is left open for its owner to read back
+        with (
+            pyarrow.OSFile(path, 'wb') if isinstance(path, str) else nullcontext(path)
+        ) as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+class WorkQueue:
+    """Work units of a fleet run, held in a SQLite database
+
+    The coordinator creates the units and the run settings. Workers on any
+    host that can open the database claim one unit at a time under a lease
+    and record its result and timing. A unit whose worker fails, or whose
+    lease expires because its worker stopped, goes back to pending until it
+    has had max_attempts attempts, and is then marked failed. Claims run in
+    an immediate transaction, so no two workers ever hold the same unit.
+    path ':memory:' keeps the queue in this process, to be served over TCP
+    (see QueueServer).
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        import sqlite3
+        import threading
+
+        self.path = path
+        self._db = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        # Serializes the threads of a QueueServer sharing this connection
+        self._lock = threading.Lock()
+        self._settings: Optional[Dict[str, Any]] = None
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS units (
+                id INTEGER PRIMARY KEY, configs TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, lease TEXT,
+                lease_expires REAL, seconds REAL, result TEXT, error TEXT
+            );
+        """)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[Any]:
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def create(self, units: List[List[str]], settings: Dict[str, Any]) -> None:
+        """Replace the queue's contents with a new run of units of config paths"""
+        with self._transaction() as db:
+            db.execute('DELETE FROM units')
+            db.execute('DELETE FROM meta')
+            db.executemany(
+                'INSERT INTO meta VALUES (?, ?)',
+                [(key, json.dumps(value)) for key, value in settings.items()],
+            )
+            db.executemany(
+                'INSERT INTO units (id, configs) VALUES (?, ?)',
+                [(index, json.dumps(unit)) for index, unit in enumerate(units, 1)],
+            )
+        self._settings = dict(settings)
+
+    def meta(self) -> Dict[str, Any]:
+        """Settings of the queued run
+
+        Its output root, incremental, lease_seconds and max_attempts.
+        """
+        if self._settings is None:
+            with self._lock:
+                rows = self._db.execute('SELECT key, value FROM meta').fetchall()
+            self._settings = {key: json.loads(value) for key, value in rows}
+        return self._settings
+
+    @staticmethod
+    def _expire(db: Any, now: float, max_attempts: int) -> None:
+        db.execute(
+            "UPDATE units SET state = 'failed', lease = NULL, "
+            "error = 'Lease of ' || worker || ' expired' "
+            "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, max_attempts),
+        )
+
+    def expire(self) -> None:
+        """Fail units whose last attempt's lease ran out"""
+        max_attempts = self.meta()['max_attempts']
+        with self._transaction() as db:
+            self._expire(db, time.time(), max_attempts)
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Lease the next pending or abandoned unit to worker, or None if there is none
+
+        New units are handed out before retries, so a unit that keeps failing
+        does not hold a worker ahead of the rest of the run.
+        """
+        import uuid
+
+        settings = self.meta()
+        now = time.time()
+        lease = uuid.uuid4().hex
+        with self._transaction() as db:
+            self._expire(db, now, settings['max_attempts'])
+            row = db.execute(
+                "SELECT id, configs, attempts FROM units "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY attempts, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE units SET state = 'leased', attempts = attempts + 1, "
+                "worker = ?, lease = ?, lease_expires = ? WHERE id = ?",
+                (worker, lease, now + settings['lease_seconds'], row[0]),
+            )
+        return {
+            'id': row[0],
+            'configs': json.loads(row[1]),
+            'attempt': row[2] + 1,
+            'lease': lease,
+        }
+
+    def renew(self, unit_id: int, lease: str) -> bool:
+        """Extend a unit's lease; False if it expired and another worker has the unit"""
+        expires = time.time() + self.meta()['lease_seconds']
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE units SET lease_expires = ? WHERE id = ? AND lease = ?",
+                (expires, unit_id, lease),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, unit_id: int, lease: str, result: Dict[str, Any]) -> bool:
+        """Record a finished unit; False if its lease was lost to another worker"""
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE units SET state = 'done', lease = NULL, seconds = ?, "
+                "result = ?, error = NULL WHERE id = ? AND lease = ?",
+                (result['seconds'], json.dumps(result), unit_id, lease),
+            )
+        return cursor.rowcount == 1
+
+    def fail(
+        self, unit_id: int, lease: str, error: str, result: Dict[str, Any]
+    ) -> bool:
+        """Record a failed attempt and queue the unit again if it has attempts left"""
+        max_attempts = self.meta()['max_attempts']
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE units SET "
+                "state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease = NULL, seconds = ?, result = ?, error = ? "
+                "WHERE id = ? AND lease = ?",
+                (
+                    max_attempts,
+                    result['seconds'],
+                    json.dumps(result),
+                    error,
+                    unit_id,
+                    lease,
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        """Number of units per state: pending, leased, done and failed"""
+        counts = dict.fromkeys(('pending', 'leased', 'done', 'failed'), 0)
+        with self._lock:
+            counts.update(
+                self._db.execute(
+                    'SELECT state, COUNT(*) FROM units GROUP BY state'
+                ).fetchall()
+            )
+        return counts
+
+    def finished(self) -> bool:
+        """Whether every unit is done or has failed for good"""
+        counts = self.counts()
+        return not counts['pending'] and not counts['leased']
+
+    def units(self) -> List[Dict[str, Any]]:
+        """Every unit with its state, attempts, last worker, timing and result"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT id, configs, state, attempts, worker, seconds, result, error '
+                'FROM units ORDER BY id'
+            ).fetchall()
+        units = []
+        for unit_id, configs, state, attempts, worker, seconds, result, error in rows:
+            units.append(
+                {
+                    'id': unit_id,
+                    'configs': json.loads(configs),
+                    'state': state,
+                    'attempts': attempts,
+                    'worker': worker,
+                    'seconds': seconds,
+                    'result': json.loads(result) if result else None,
+                    'error': error,
+                }
+            )
+        return units
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class QueueServer:
+    """Serve a WorkQueue to fleet workers over TCP, one thread per connection
+
+    Requests and replies are JSON lines: {"op": name, "args": [...]} is
+    answered with {"result": value} or {"error": message}. Only the methods
+    a worker needs can be called. With a token, every request must carry it
+    as "token", and a connection that sends a wrong one is closed. Without
+    one, the queue may only be served on a loopback address.
+    """
+
+    OPERATIONS = frozenset(
+        {'meta', 'claim', 'renew', 'complete', 'fail', 'counts', 'finished'}
+    )
+
+    def __init__(
+        self, queue: WorkQueue, host: str, port: int, token: Optional[str] = None
+    ):
+        import ipaddress
+        import socket
+        import threading
+
+        self.queue = queue
+        self._token = token.encode('utf-8') if token else None
+        try:
+            self._socket = socket.create_server((host, port))
+        except OSError as e:
+            raise ConfigError(
+                f"Cannot serve the fleet queue on {host}:{port}: {e}"
+            ) from None
+        self.address = self._socket.getsockname()[:2]
+        bound_host = self.address[0].partition('%')[0]
+        if self._token is None and not ipaddress.ip_address(bound_host).is_loopback:
+            self._socket.close()
+            raise ConfigError(
+                f"Serving the fleet queue on {host}:{port} lets any host claim and "
+                f"complete work units; set {QUEUE_TOKEN_ENV} on the coordinator and "
+                f"its workers"
+            )
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        import threading
+        threading.Thread(target=self._accept, name='fleet-queue', daemon=True).start()
+
+    def _accept(self) -> None:
+        import threading
+        while True:
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._connections += 1
+            threading.Thread(
+                target=self._serve, args=(connection,), daemon=True
+            ).start()
+
+    def _serve(self, connection: Any) -> None:
+        try:
+            with connection, connection.makefile('rwb') as stream:
+                for line in stream:
+                    try:
+                        request = json.loads(line)
+                        if not self._authorized(request):
+                            stream.write(REFUSED_REPLY)
+                            stream.flush()
+                            return
+                        if request['op'] not in self.OPERATIONS:
+                            raise ValueError(f"Unknown operation: {request['op']}")
+                        reply = {
+                            'result': getattr(self.queue, request['op'])(
+                                *request.get('args', ())
+                            )
+                        }
+                    except Exception as e:
+                        reply = {'error': f"{type(e).__name__}: {e}"}
+                    stream.write(json.dumps(reply).encode('utf-8') + b'\n')
+                    stream.flush()
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._connections -= 1
+
+    def _authorized(self, request: Any) -> bool:
+        if self._token is None:
+            return True
+        import hmac
+
+        token = request.get('token') if isinstance(request, dict) else None
+        return isinstance(token, str) and hmac.compare_digest(
+            token.encode('utf-8'), self._token
+        )
+
+    def close(self, grace_seconds: float = 5.0) -> None:
+        """Stop accepting workers
+
+        Connected ones get up to grace_seconds to see that the run finished.
+        """
+        deadline = time.monotonic() + grace_seconds
+        while self._connections and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._socket.close()
+
+
+class RemoteQueue:
+    """A WorkQueue served by a fleet coordinator (see QueueServer)
+
+    Used by workers on other hosts.
+    """
+
+    def __init__(
+        self, host: str, port: int, timeout: float = 60.0, token: Optional[str] = None
+    ):
+        import socket
+
+        try:
+            self._socket = socket.create_connection((host, port), timeout)
+        except OSError as e:
+            raise ConfigError(
+                f"Cannot reach the fleet coordinator at {host}:{port}: {e}"
+            ) from None
+        self._stream = self._socket.makefile('rwb')
+        self._settings: Optional[Dict[str, Any]] = None
+        self._token = token
+
+    def _call(self, op: str, *args: Any) -> Any:
+        request: Dict[str, Any] = {'op': op, 'args': args}
+        if self._token:
+            request['token'] = self._token
+        try:
+            self._stream.write(json.dumps(request).encode('utf-8') + b'\n')
+            self._stream.flush()
+            line = self._stream.readline()
+        except OSError as e:
+            raise ConfigError(f"Lost the fleet coordinator: {e}") from None
+        if not line:
+            raise ConfigError("The fleet coordinator closed the connection")
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise ConfigError(f"Fleet coordinator: {reply['error']}")
+        return reply['result']
+
+    def meta(self) -> Dict[str, Any]:
+        if self._settings is None:
+            self._settings = self._call('meta')
+        return self._settings
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        return self._call('claim', worker)
+
+    def renew(self, unit_id: int, lease: str) -> bool:
+        return self._call('renew', unit_id, lease)
+
+    def complete(self, unit_id: int, lease: str, result: Dict[str, Any]) -> bool:
+        return self._call('complete', unit_id, lease, result)
+
+    def fail(
+        self, unit_id: int, lease: str, error: str, result: Dict[str, Any]
+    ) -> bool:
+        return self._call('fail', unit_id, lease, error, result)
+
+    def counts(self) -> Dict[str, int]:
+        return self._call('counts')
+
+    def finished(self) -> bool:
+        return self._call('finished')
+
+    def close(self) -> None:
+        self._stream.close()
+        self._socket.close()
+
+
+def queue_server_address(address: str) -> Optional[Tuple[str, int]]:
+    """(host, port) of a tcp://HOST:PORT queue address, or None for a SQLite file"""
+    if not address.startswith(QUEUE_URL_SCHEME):
+        return None
+    host, _, port = address[len(QUEUE_URL_SCHEME):].rpartition(':')
+    if not host or not port.isdigit():
+        raise ConfigError(f"Fleet queue address must be tcp://HOST:PORT: {address}")
+    return host, int(port)
+
+
+def open_work_queue(address: str) -> Any:
+    """Open an existing fleet queue for a worker: a SQLite file, or tcp://HOST:PORT"""
+    server = queue_server_address(address)
+    if server is not None:
+        return RemoteQueue(*server, token=os.environ.get(QUEUE_TOKEN_ENV))
+    if not Path(address).is_file():
+        raise ConfigError(f"Fleet queue not found: {address}")
+    return WorkQueue(address)
+
+
+def shard_configs(config_paths: List[Path], shard_size: int) -> List[List[Path]]:
+    """Split configurations into work units of up to shard_size, largest units first
+
+    Neighbouring configs stay together. Putting the units with the most
+    config bytes at the front of the queue keeps the likely slowest ones
+    from starting last and holding up the end of the run.
+    """
+    def size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+
+    units = [
+        config_paths[start : start + shard_size]
+        for start in range(0, len(config_paths), shard_size)
+    ]
+    return sorted(units, key=lambda unit: -sum(size(path) for path in unit))
+
+
+# Per-process processor used by render pool workers, and its stage events not
+# yet returned
+_worker_processor: Optional[TemplateProcessor] = None
+_worker_events: List[StageEvent] = []
+# Frozen render contexts of the pool's jobs, by config index: set by the parent
+# before forking workers, which inherit them, or by the worker initializer
+_shared_contexts: List[FrozenConfig] = []
+
+
+def _render_pool_context() -> Any:
+    """The multiprocessing context for a render pool: fork when forking is safe here
+
+    Forked workers inherit the frozen render contexts copy-on-write rather
+    than unpickling a copy each. Forking a process that runs other threads
+    (watch mode, the render service, a fleet queue server) can deadlock, so
+    forkserver, or spawn where it is missing, is chosen explicitly then:
+    before Python 3.14 the default start method on Linux is still fork.
+    """
+    import multiprocessing
+    import threading
+
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context(
+        'forkserver' if 'forkserver' in methods else 'spawn'
+    )
+
+
+def _init_render_worker(
+    project_root: Path,
+    options: Dict[str, Any],
+    template_names: List[str],
+    contexts: Optional[List[FrozenConfig]] = None,
+) -> None:
+    """Create the worker's processor and compile its templates once"""
+    global _worker_processor, _shared_contexts
+    if contexts is not None:
+        _shared_contexts = contexts
+    _worker_processor = TemplateProcessor(project_root, **options)
+    # Warm-up compile events ride along with the worker's first job
+    _worker_processor.add_hook(_worker_events.append)
+    _worker_processor.warm_templates(template_names)
+
+
+def _run_render_job(job: tuple) -> RenderResult:
+    """Render one (config index, template name, stream dir) job in a pool worker"""
+    config_index, template_name, stream_dir = job
+    render_cache = _worker_processor.render_cache
+    fragment_cache = _worker_processor.fragment_cache
+    before = dict(render_cache.stats) if render_cache is not None else None
+    fragments_before = dict(fragment_cache.stats)
+    result = _worker_processor.render_job(
+        config_index, template_name, _shared_contexts[config_index], stream_dir
+    )
+    result.events = list(_worker_events)
+    _worker_events.clear()
+    if before is not None:
+        result.cache_stats = {
+            name: count - before[name] for name, count in render_cache.stats.items()
+        }
+    result.fragment_stats = {
+        name: count - fragments_before[name]
+        for name, count in fragment_cache.stats.items()
+    }
+    return result
+
+
+def find_configs(pattern: str, base: Path) -> List[Path]:
+    """Expand a directory or glob pattern into a sorted list of config files"""
+    path = base / pattern
+    if path.is_dir():
+        return sorted(p for p in path.iterdir() if p.suffix in CONFIG_SUFFIXES)
+    import glob
+    return sorted(Path(p) for p in glob.glob(str(path), recursive=True))
+
+
+def config_output_dirs(
+    config_paths: List[Path], config_root: Optional[Path] = None
+) -> List[Path]:
+    """Relative output directory of each configuration of a batch
+
+    Each is the config's path relative to config_root, without its suffix.
+    config_root defaults to the deepest directory holding every config, so
+    configs/*.yaml map to <config stem> and repos/*/project-config.yaml to
+    <repo>/project-config. Raises ConfigError when two configs would share
+    a directory, rather than letting one overwrite or prune the other.
+    """
+    paths = [path.resolve() for path in config_paths]
+    if config_root is None:
+        config_root = (
+            Path(os.path.commonpath([path.parent for path in paths]))
+            if paths
+            else Path()
+        )
+    output_dirs = []
+    seen: Dict[Path, Path] = {}
+    for config_path, path in zip(config_paths, paths):
+        output_dir = path.relative_to(config_root).with_suffix('')
+        if output_dir in seen:
+            raise ConfigError(
+                f"Configurations {seen[output_dir]} and {config_path} "
+                f"would both be written to {output_dir}"
+            )
+        seen[output_dir] = config_path
+        output_dirs.append(output_dir)
+    return output_dirs
+
+
+def report_template_errors(result: ConfigRunResult) -> None:
+    """Print the per-template errors collected for one configuration"""
+    for error in result.template_errors.values():
+        console.print(f"[red]{error}[/red]")
+
+
+def report_timings(processor: TemplateProcessor, total: float) -> None:
+    """Print the per-stage timing breakdown of a run"""
+    console.print("[blue]Timing breakdown:[/blue]")
+    for stage in ('load_config', 'validate', 'lookup', 'compile', 'render', 'write'):
+        seconds = processor.timings.get(stage, 0.0)
+        share = seconds / total * 100 if total else 0.0
+        console.print(f"  {stage:<12} {seconds:8.3f}s  {share:5.1f}%")
+    console.print(f"  {'total':<12} {total:8.3f}s")
+    if processor.render_cache is not None:
+        stats = processor.render_cache.stats
+        console.print(
+            f"[blue]Render cache: {processor.render_cache.hits} hits "
+            f"({stats['memory_hits']} memory, {stats['disk_hits']} disk), "
+            f"{stats['misses']} misses[/blue]"
+        )
+    stats = processor.fragment_cache.stats
+    if stats['memory_hits'] or stats['misses']:
+        console.print(
+            f"[blue]Fragment cache: {stats['memory_hits']} hits, "
+            f"{stats['misses']} misses[/blue]"
+        )
+
+
+def report_config_error(error: ConfigError) -> None:
+    """Print a configuration error, one line per validation issue"""
+    if isinstance(error, ConfigValidationError):
+        where = f" in {error.source}" if error.source else ""
+        console.print(f"[red]Error: Invalid configuration{where}:[/red]")
+        for issue in error.issues:
+            console.print(f"[red]  - {issue}[/red]")
+    else:
+        console.print(f"[red]Error: {error}[/red]")
+
+
+def run_validate_only(processor: TemplateProcessor, config_paths: List[Path]) -> bool:
+    """Load and validate configurations without rendering, reporting every issue
+
+    Returns whether every configuration is valid.
+    """
+    start = time.perf_counter()
+    invalid = 0
+    for config_path in config_paths:
+        try:
+            processor.load_config(config_path)
+        except ConfigError as e:
+            invalid += 1
+            report_config_error(e)
+    total = time.perf_counter() - start
+
+    rate = len(config_paths) / total if total else 0.0
+    console.print(f"[blue]Validated {len(config_paths)} configurations in {total:.3f}s "
+                  f"({rate:.0f}/s, {invalid} invalid)[/blue]")
+    return not invalid
+
+
+def run_batch(
+    processor: TemplateProcessor,
+    config_paths: List[Path],
+    output: str,
+    workers: int = 1,
+    incremental: bool = False,
+    archive: Optional[OutputArchive] = None,
+) -> bool:
+    """Run a batch generation and report per-config and total wall time
+
+    Returns whether every configuration was generated.
+    """
+    start = time.perf_counter()
+    try:
+        results = processor.generate_many(
+            config_paths,
+            Path(output),
+            workers=workers,
+            incremental=incremental,
+            archive=archive,
+        )
+    except ConfigError as e:
+        report_config_error(e)
+        return False
+    total = time.perf_counter() - start
+
+    failures = 0
+    totals: Dict[str, int] = defaultdict(int)
+    for result in results:
+        report_template_errors(result)
+        for name, count in result.output_stats.items():
+            totals[name] += count
+        if result.ok:
+            up_to_date = (
+                f", {len(result.up_to_date)} up to date" if result.up_to_date else ""
+            )
+            console.detail(
+                f"[green]{result.config_path}: {len(result.documents)} documents"
+                f"{up_to_date} in {result.seconds:.3f}s[/green]"
+            )
+        else:
+            failures += 1
+            console.print(
+                f"[red]{result.config_path}: failed ({result.error}) "
+                f"after {result.seconds:.3f}s[/red]"
+            )
+
+    console.print(
+        f"[blue]Processed {len(results)} configurations in {total:.3f}s "
+        f"({failures} failed); {format_output_stats(totals)}[/blue]"
+    )
+    return not failures
+
+
+def format_output_stats(stats: Mapping[str, int]) -> str:
+    return (
+        f"{stats['written']} files written, {stats['unchanged']} unchanged, "
+        f"{stats['removed']} removed"
+    )
+
+
+def fleet_config_result(result: ConfigRunResult) -> Dict[str, Any]:
+    """JSON summary of one configuration of a fleet work unit"""
+    return {
+        'config': str(result.config_path),
+        'config_key': result.config_key,
+        'output_dir': str(result.output_dir),
+        'documents': len(result.documents),
+        'up_to_date': len(result.up_to_date),
+        'seconds': result.seconds,
+        'error': result.error,
+        'template_errors': result.template_errors,
+        'output_stats': result.output_stats,
+    }
+
+
+def run_fleet_worker(
+    processor: TemplateProcessor, queue: Any, name: Optional[str] = None
+) -> int:
+    """Generate work units claimed from a fleet queue until the run is finished
+
+    One processor serves every unit, so templates are compiled once, up
+    front, and its caches stay warm between units. Each configuration is
+    generated as in a batch run, and the unit's lease is renewed after each.
+    Invalid configurations and template errors are results, reported to the
+    coordinator like any other; an exception, such as an I/O error on
+    shared storage, fails the unit so it is retried. Returns the number of
+    units completed.
+    """
+    import socket
+
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    settings = queue.meta()
+    if not settings:
+        raise ConfigError("The fleet queue holds no run")
+    output_root = Path(settings['output'])
+    config_root = Path(settings['config_root'])
+    processor.warm_templates(sorted(processor.registry.by_name))
+    completed = 0
+    while True:
+        unit = queue.claim(name)
+        if unit is None:
+            if queue.finished():
+                return completed
+            time.sleep(FLEET_POLL_SECONDS)
+            continue
+
+        start = time.perf_counter()
+        configs: List[Dict[str, Any]] = []
+        error = None
+        lost = False
+        try:
+            for config_path in unit['configs']:
+                result = processor.generate_many(
+                    [Path(config_path)],
+                    output_root,
+                    incremental=settings['incremental'],
+                    config_root=config_root,
+                )[0]
+                configs.append(fleet_config_result(result))
+                if not queue.renew(unit['id'], unit['lease']):
+                    lost = True
+                    break
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        report = {
+            'worker': name,
+            'attempt': unit['attempt'],
+            'seconds': time.perf_counter() - start,
+            'configs': configs,
+        }
+
+        if lost:
+            console.print(
+                f"[yellow]Unit {unit['id']}: lease expired and was taken over; "
+                f"abandoned[/yellow]"
+            )
+        elif error is not None:
+            queue.fail(unit['id'], unit['lease'], error, report)
+            console.print(
+                f"[red]Unit {unit['id']} failed on attempt {unit['attempt']}: "
+                f"{error}[/red]"
+            )
+        elif queue.complete(unit['id'], unit['lease'], report):
+            completed += 1
+            console.detail(f"[green]Unit {unit['id']}: {len(configs)} configurations "
+                           f"in {report['seconds']:.3f}s[/green]")
+
+
+def _run_fleet_worker_process(
+    address: str,
+    project_root: Path,
+    options: Dict[str, Any],
+    plain: bool,
+    summary_only: bool,
+) -> None:
+    """Entry point of a fleet worker process started by start_fleet_workers"""
+    console.plain = plain
+    console.summary_only = summary_only
+    try:
+        processor = TemplateProcessor(project_root, **options)
+        queue = open_work_queue(address)
+    except ConfigError as e:
+        report_config_error(e)
+        sys.exit(1)
+    try:
+        run_fleet_worker(processor, queue)
+    finally:
+        queue.close()
+
+
+def start_fleet_workers(
+    address: str, processor: TemplateProcessor, count: int
+) -> List[Any]:
+    """Start count fleet worker processes on this host, each with its own warm processor
+
+    Workers are spawned, never forked: the parent may be serving the queue
+    from threads, and a forked child would share its SQLite connection.
+    """
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=_run_fleet_worker_process,
+            args=(
+                address,
+                processor.project_root,
+                processor.options,
+                console.plain,
+                console.summary_only,
+            ),
+        )
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def run_fleet_coordinator(
+    processor: TemplateProcessor,
+    config_paths: List[Path],
+    output: str,
+    address: str,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    incremental: bool = False,
+    local_workers: int = 0,
+) -> bool:
+    """Shard configurations into a fleet queue, wait for workers to finish it and report
+
+    Prints each unit as it finishes, with its worker and timing, then the
+    totals. Returns whether every unit and every configuration succeeded.
+    """
+    # Workers name each output directory relative to the same root, as a batch run does
+    config_root = Path(
+        os.path.commonpath([path.resolve().parent for path in config_paths])
+    )
+    config_output_dirs(config_paths, config_root)
+    units = shard_configs(config_paths, shard_size)
+    server_address = queue_server_address(address)
+    queue = WorkQueue(':memory:' if server_address else address)
+    queue.create(
+        [[str(path.resolve()) for path in unit] for unit in units],
+        {
+            'output': str(Path(output).resolve()),
+            'config_root': str(config_root),
+            'incremental': incremental,
+            'max_attempts': max_attempts,
+            'lease_seconds': DEFAULT_LEASE_SECONDS,
+        },
+    )
+    server = None
+    if server_address is not None:
+        # Local workers inherit the token through the environment
+        server = QueueServer(
+            queue, *server_address, token=os.environ.get(QUEUE_TOKEN_ENV)
+        )
+        server.start()
+        # Port 0 binds any free port; local workers connect to the one actually bound
+        host, port = server.address
+        address = f"{QUEUE_URL_SCHEME}{host}:{port}"
+        loopback = {'0.0.0.0': '127.0.0.1', '::': '::1', '': '127.0.0.1'}
+        local_host = loopback.get(host, host)
+        local_address = f"{QUEUE_URL_SCHEME}{local_host}:{port}"
+    else:
+        local_address = address
+    console.print(
+        f"[blue]Queued {len(config_paths)} configurations in {len(units)} units "
+        f"on {address}; waiting for workers[/blue]"
+    )
+
+    start = time.perf_counter()
+    processes = start_fleet_workers(local_address, processor, local_workers)
+    reported: Set[int] = set()
+    try:
+        while True:
+            queue.expire()
+            finished = queue.finished()
+            for unit in queue.units():
+                if unit['state'] in ('done', 'failed') and unit['id'] not in reported:
+                    reported.add(unit['id'])
+                    report_fleet_unit(unit)
+            if finished:
+                break
+            time.sleep(FLEET_POLL_SECONDS)
+    finally:
+        for process in processes:
+            process.join()
+        if server is not None:
+            server.close()
+    total = time.perf_counter() - start
+
+    results = queue.units()
+    queue.close()
+    failed_units = sum(unit['state'] == 'failed' for unit in results)
+    retried = sum(unit['attempts'] > 1 for unit in results)
+    failed_configs = 0
+    totals: Dict[str, int] = defaultdict(int)
+    workers: Set[str] = set()
+    for unit in results:
+        if unit['state'] == 'done':
+            workers.add(unit['worker'])
+            for config in unit['result']['configs']:
+                failed_configs += config['error'] is not None
+                for name, count in config['output_stats'].items():
+                    totals[name] += count
+    console.print(
+        f"[blue]Fleet processed {len(config_paths)} configurations in "
+        f"{len(results)} units by {len(workers)} workers in {total:.3f}s "
+        f"({failed_configs} configurations failed, {failed_units} units failed, "
+        f"{retried} units retried); {format_output_stats(totals)}[/blue]"
+    )
+    return not failed_units and not failed_configs
+
+
+def report_fleet_unit(unit: Dict[str, Any]) -> None:
+    """Print a finished fleet work unit and the errors of its configurations"""
+    attempts = f" after {unit['attempts']} attempts" if unit['attempts'] > 1 else ""
+    if unit['state'] == 'failed':
+        console.print(
+            f"[red]Unit {unit['id']} ({len(unit['configs'])} configurations) "
+            f"failed{attempts}: {unit['error']}[/red]"
+        )
+        return
+    for config in unit['result']['configs']:
+        for error in config['template_errors'].values():
+            console.print(f"[red]{error}[/red]")
+        if config['error'] is not None:
+            console.print(f"[red]{config['config']}: failed ({config['error']})[/red]")
+    console.detail(
+        f"[green]Unit {unit['id']}: {len(unit['configs'])} configurations "
+        f"by {unit['worker']} in {unit['seconds']:.3f}s{attempts}[/green]"
+    )
+
 
 @click.command()
 @click.option('--config', '-c', default='project-config.yaml', help='Configuration file path')
+@click.option('--configs',
+              help='Directory or glob of configuration files to generate in one batch')
 @click.option('--output', '-o', default='docs', help='Output directory')
+@click.option('--output-format', type=click.Choice(['directory', 'archive']),
+              default='directory', show_default=True,
+              help='Write documents as files in the output directory, or stream them '
+                   'into the one archive file --output names (.zip, .tar, .tar.gz or '
+                   '.tar.zst); batch runs put each config under its name')
+@click.option('--workers', '-w', default=1, type=click.IntRange(min=1),
+              help='Render (config, template) jobs over a pool of N processes')
+@click.option('--incremental', '-i', is_flag=True,
+              help='Only re-render documents whose template or config inputs changed')
+@click.option('--validate-only', is_flag=True,
+              help='Validate the configuration(s) against the schema and exit')
+@click.option('--watch', is_flag=True,
+              help='Keep running and re-render affected documents when the config '
+                   'or templates change')
+@click.option('--dump-deps', type=click.Path(dir_okay=False, path_type=Path),
+              help="Write each template's config-key dependency map as JSON and exit")
+@click.option('--stream', is_flag=True,
+              help='Stream rendered output to disk in chunks instead of building '
+                   'whole documents in memory')
+@click.option('--bytecode-cache', is_flag=True,
+              help='Reuse compiled templates across runs from --cache-dir')
+@click.option('--config-cache', is_flag=True,
+              help='Reuse parsed configuration files across runs from --cache-dir')
+@click.option('--render-cache', is_flag=True,
+              help='Reuse rendered documents whose template and config inputs match, '
+                   'across projects and runs')
+@click.option('--table-export', 'table_exports', multiple=True,
+              type=click.Choice(sorted(COLUMNAR_FORMATS)),
+              help='Also write tabular documents such as the features CSV as Parquet '
+                   'or Arrow (needs pyarrow)')
+@click.option('--build-bundle', type=click.Path(dir_okay=False, path_type=Path),
+              help='Precompile every template into a bundle zip for --bundle and exit')
+@click.option('--bundle', type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help='Load precompiled templates from a bundle built with --build-bundle')
+@click.option('--cache-dir', type=click.Path(file_okay=False, path_type=Path),
+              default=DEFAULT_CACHE_DIR, show_default=True,
+              help='Directory for the compiled-template, parsed-config and '
+                   'render caches')
+@click.option('--cache-max-size', default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+              type=click.IntRange(min=1), show_default=True,
+              help='Maximum size of each cache in MB')
+@click.option('--clear-cache', is_flag=True,
+              help='Empty the compiled-template, parsed-config and render caches '
+                   'and exit')
+@click.option('--timings', is_flag=True, help='Print how long each pipeline stage took')
+@click.option('--profile', type=click.Path(dir_okay=False, path_type=Path),
+              help='Write per-stage and per-template timings and output sizes as JSON')
+@click.option('--trace', type=click.Path(dir_okay=False, path_type=Path),
+              help='Write a Chrome trace (chrome://tracing, Perfetto) of every '
+                   'pipeline stage')
+@click.option('--fsync', is_flag=True,
+              help='Sync written files to disk once at the end of each output '
+                   'directory')
+@click.option('--prune/--no-prune', default=True, show_default=True,
+              help='Delete previously generated files whose templates are no longer '
+                   'rendered')
+@click.option('--coordinate', metavar='QUEUE',
+              help='Shard --configs into work units on QUEUE and wait for fleet '
+                   'workers to generate them; QUEUE is a SQLite file on shared '
+                   'storage, or tcp://HOST:PORT to serve it from here')
+@click.option('--work', metavar='QUEUE',
+              help='Run as a fleet worker, generating work units from QUEUE until the '
+                   'run is finished; with --workers, start N worker processes')
+@click.option('--shard-size', default=DEFAULT_SHARD_SIZE, type=click.IntRange(min=1),
+              show_default=True, help='Configurations per fleet work unit')
+@click.option('--max-attempts', default=DEFAULT_MAX_ATTEMPTS,
+              type=click.IntRange(min=1), show_default=True,
+              help='Attempts a failed or abandoned fleet work unit gets before it is '
+                   'reported as failed')
+@click.option('--local-workers', default=0, type=click.IntRange(min=0),
+              help='With --coordinate, also start N fleet workers on this host')
+@click.option('--summary', is_flag=True,
+              help='Print totals and errors only, not a line per file')
+@click.option('--plain/--rich', default=None,
+              help='Plain output without colour or progress bars (default when '
+                   'stdout is not a terminal)')
 @click.option('--verbose', '-v', is_flag=True, help='Verbose output')
-def main(config: str, output: str, verbose: bool):
+def main(
+    config: str,
+    configs: Optional[str],
+    output: str,
+    output_format: str,
+    workers: int,
+    incremental: bool,
+    validate_only: bool,
+    watch: bool,
+    dump_deps: Optional[Path],
+    stream: bool,
+    bytecode_cache: bool,
+    config_cache: bool,
+    render_cache: bool,
+    table_exports: Tuple[str, ...],
+    build_bundle: Optional[Path],
+    bundle: Optional[Path],
+    cache_dir: Path,
+    cache_max_size: int,
+    clear_cache: bool,
+    timings: bool,
+    profile: Optional[Path],
+    trace: Optional[Path],
+    fsync: bool,
+    prune: bool,
+    coordinate: Optional[str],
+    work: Optional[str],
+    shard_size: int,
+    max_attempts: int,
+    local_workers: int,
+    summary: bool,
+    plain: Optional[bool],
+    verbose: bool,
+):
     """Stable Flow Template Processor"""
+    if plain is not None:
+        console.plain = plain
+    console.summary_only = summary
     project_root = Path.cwd()
     config_path = project_root / config
 
-    if verbose:
-        console.print(f"Project root: {project_root}")
-        console.print(f"Config file: {config_path}")
-        console.print(f"Output directory: {output}")
+    if clear_cache:
+        _bytecode_cache_type()(cache_dir / 'templates').clear()
+        ConfigCache(cache_dir / 'configs').clear()
+        RenderCache(cache_dir / 'renders').clear()
+        console.print(f"[green]Cleared caches in: {cache_dir}[/green]")
+        return
+
+    if bundle and watch:
+        raise click.UsageError(
+            "--watch recompiles templates from source and cannot be used with --bundle"
+        )
+    if coordinate and work:
+        raise click.UsageError("Run --coordinate and --work as separate processes")
+    if coordinate and not configs:
+        raise click.UsageError(
+            "--coordinate shards the configurations given with --configs"
+        )
+    if output_format == 'archive' and (incremental or watch or coordinate or work):
+        raise click.UsageError(
+            "--output-format archive writes a new archive on every run and cannot be "
+            "used with --incremental, --watch, --coordinate or --work"
+        )
+    if table_exports:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise click.UsageError(
+                "--table-export needs pyarrow: pip install 'stable-flow[analytics]'"
+            ) from None
+
+    processor_options: Dict[str, Any] = {
+        'stream_output': stream,
+        'cache_max_bytes': cache_max_size * 1024 * 1024,
+        'table_exports': table_exports,
+        'fsync': fsync,
+        'prune': prune,
+    }
+    if bytecode_cache:
+        processor_options['cache_dir'] = cache_dir / 'templates'
+    if config_cache:
+        processor_options['config_cache_dir'] = cache_dir / 'configs'
+    if render_cache:
+        processor_options['render_cache_dir'] = cache_dir / 'renders'
+    if bundle:
+        processor_options['template_bundle'] = bundle
+    try:
+        processor = TemplateProcessor(project_root, **processor_options)
+    except ConfigError as e:
+        report_config_error(e)
+        sys.exit(1)
+    run_profile = RunProfile() if profile or trace else None
+    if run_profile is not None:
+        processor.add_hook(run_profile.record)
+    run_start = time.perf_counter()
+
+    if build_bundle:
+        names = processor.build_bundle(build_bundle)
+        console.print(
+            f"[green]Compiled {len(names)} templates into bundle: "
+            f"{build_bundle}[/green]"
+        )
+        return
+
+    if dump_deps:
+        # Partials in subdirectories are covered by the templates that include them
+        template_names = sorted(
+            {Path(name).stem for name in processor.list_templates() if '/' not in name}
+        )
+        with open(dump_deps, 'w', encoding='utf-8') as f:
+            json.dump(processor.dependency_map(template_names), f, indent=2)
+        console.print(
+            f"[green]Wrote dependency map for {len(template_names)} templates: "
+            f"{dump_deps}[/green]"
+        )
+        return
+
+    if work:
+        if workers > 1:
+            processes = start_fleet_workers(work, processor, workers)
+            for process in processes:
+                process.join()
+            if any(process.exitcode for process in processes):
+                sys.exit(1)
+            return
+        try:
+            queue = open_work_queue(work)
+            completed = run_fleet_worker(processor, queue)
+        except ConfigError as e:
+            report_config_error(e)
+            sys.exit(1)
+        queue.close()
+        console.print(
+            f"[blue]Fleet run finished; this worker completed {completed} units[/blue]"
+        )
+        return
+
+    if configs:
+        config_paths = find_configs(configs, project_root)
+        if not config_paths:
+            console.print(f"[red]Error: No configuration files match: {configs}[/red]")
+            sys.exit(1)
+    else:
+        config_paths = [config_path]
+        if verbose:
+            console.print(f"Project root: {project_root}")
+            console.print(f"Config file: {config_path}")
+            console.print(f"Output directory: {output}")
+
+    archive = None
+    if output_format == 'archive' and not validate_only:
+        try:
+            archive = OutputArchive(Path(output))
+        except ConfigError as e:
+            raise click.UsageError(str(e)) from None
+
+    try:
+        if validate_only:
+            ok = run_validate_only(processor, config_paths)
+        elif coordinate:
+            try:
+                ok = run_fleet_coordinator(
+                    processor,
+                    config_paths,
+                    output,
+                    coordinate,
+                    shard_size,
+                    max_attempts,
+                    incremental,
+                    local_workers,
+                )
+            except ConfigError as e:
+                report_config_error(e)
+                ok = False
+        elif configs:
+            ok = run_batch(
+                processor, config_paths, output, workers, incremental, archive
+            )
+        else:
+            ok = True
+            try:
+                generate_config(
+                    processor,
+                    config_path,
+                    output,
+                    workers,
+                    incremental or watch,
+                    archive,
+                )
+            except ConfigError as e:
+                # Validation or loading failed, exit with error code
+                report_config_error(e)
+                ok = False
+    except BaseException:
+        if archive is not None:
+            archive.abort()
+        raise
+    if archive is not None:
+        if archive.members:
+            archive.close()
+            console.print(
+                f"[green]Wrote {archive.members} files to archive: "
+                f"{archive.path}[/green]"
+            )
+        else:
+            archive.abort()
+
+    if timings:
+        report_timings(processor, time.perf_counter() - run_start)
+    if run_profile is not None:
+        if profile:
+            run_profile.write_json(profile)
+            console.print(f"[green]Wrote profile: {profile}[/green]")
+        if trace:
+            run_profile.write_chrome_trace(trace)
+            console.print(f"[green]Wrote trace: {trace}[/green]")
+
+    if watch and not configs and not validate_only:
+        run_watch(processor, config_path, output, workers)
+    elif not ok:
+        sys.exit(1)
+
 
+def generate_config(
+    processor: TemplateProcessor,
+    config_path: Path,
+    output: str,
+    workers: int,
+    incremental: bool,
+    archive: Optional[OutputArchive] = None,
+) -> None:
+    """Load one configuration and generate its documents, into archive when given"""
+    config_data = processor.load_config(config_path)
+
+    # Override output directory if specified
+    if output != 'docs':
+        config_data['output'] = {'directory': output}
+
+    console.print(f"[blue]Processing templates for tier: {config_data['tier']}[/blue]")
+    if workers > 1:
+        result = processor.generate_documents_parallel(
+            config_data, workers, incremental, archive
+        )
+        report_template_errors(result)
+        for output_path in result.documents:
+            console.detail(f"[green]Generated: {output_path}[/green]")
+    else:
+        output_dir = Path() if archive is not None else output_directory(config_data)
+        result = ConfigRunResult(config_path, output_dir)
+        processor._generate_into(result, config_data, incremental, archive)
+        report_template_errors(result)
+    console.print(
+        "[green]Document generation complete! "
+        f"{format_output_stats(result.output_stats)}[/green]"
+    )
+
+
+def run_watch(
+    processor: TemplateProcessor, config_path: Path, output: str, workers: int
+) -> None:
+    """Re-render affected documents whenever the config or a template changes
+
+    The processor and its compiled templates stay resident between changes.
+    Changed templates are recompiled and incremental mode re-renders only the
+    documents whose fingerprint changed.
+    """
+    source_dir = processor.source_dir.resolve()
+    # Base configurations are re-read by load_config once their files change
+    watcher = FileWatcher([config_path, *processor.base_config_paths, source_dir])
+    console.print(
+        f"[blue]Watching {config_path} and {processor.source_dir} "
+        f"(Ctrl+C to stop)[/blue]"
+    )
     try:
-        processor = TemplateProcessor(project_root)
-        config_data = processor.load_config(config_path)
-
-        # Override output directory if specified
-        if output != 'docs':
-            config_data['output'] = {'directory': output}
-
-        console.print(f"[blue]Processing templates for tier: {config_data['tier']}[/blue]")
-        processor.generate_documents(config_data)
-        console.print("[green]Document generation complete![/green]")
-    except SystemExit as e:
-        # Validation or processing failed, exit with error code
-        sys.exit(e.code if hasattr(e, 'code') else 1)
+        while True:
+            changed = watcher.wait()
+            processor.reload_templates(
+                path.relative_to(source_dir).as_posix()
+                for path in changed
+                if source_dir in path.parents
+            )
+            for path in sorted(changed):
+                console.print(f"[dim]Changed: {path}[/dim]")
+            try:
+                generate_config(
+                    processor, config_path, output, workers, incremental=True
+                )
+            except ConfigError as e:
+                report_config_error(e)
+                console.print(
+                    "[yellow]Waiting for the configuration to be fixed...[/yellow]"
+                )
+    except KeyboardInterrupt:
+        console.print("[blue]Stopped watching[/blue]")
+
 
 if __name__ == '__main__':
     main()
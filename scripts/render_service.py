@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Stable Flow Render Service
+
+A local HTTP service that renders documents from posted configurations with
+one resident, pre-warmed TemplateProcessor, so each request costs only the
+render itself instead of an interpreter start and template compilation.
+
+    POST /render               config as JSON or YAML; returns the documents as JSON
+    POST /render?format=zip    returns the documents as a zip archive
+    GET  /templates            templates each tier renders, and the template registry
+    GET  /health               liveness and current load
+
+`?templates=a,b` limits a render to some of the tier's templates. Rendering
+runs on a bounded thread pool; once every worker is busy and the wait queue
+is full, requests are refused with 503 rather than queued without limit, and
+a render that exceeds the request timeout returns 504.
+
+The service runs on a built-in asyncio HTTP/1.1 server with no extra
+dependencies. RenderService is also an ASGI application, so with uvicorn
+installed `--server uvicorn` serves it instead.
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import json
+import sys
+import time
+import zipfile
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from process_templates import (  # noqa: E402
+    ConfigError, ConfigValidationError, TemplateProcessor, VALID_TIERS, load_yaml,
+)
+
+DEFAULT_PORT = 8750
+DEFAULT_MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Bodies of any other content type are parsed as YAML, a superset of JSON
+JSON_CONTENT_TYPE = 'application/json'
+
+
+class Response:
+    """An HTTP response produced by RenderService.handle"""
+
+    __slots__ = ('status', 'body', 'content_type', 'headers')
+
+    def __init__(self, status: int, body: bytes, content_type: str = JSON_CONTENT_TYPE,
+                 headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    @classmethod
+    def json(
+        cls, status: int, data: Any, headers: Optional[Dict[str, str]] = None
+    ) -> 'Response':
+        return cls(status, json.dumps(data).encode('utf-8'), JSON_CONTENT_TYPE, headers)
+
+    @classmethod
+    def error(cls, status: int, message: str, **extra: Any) -> 'Response':
+        return cls.json(status, {'error': message, **extra})
+
+    def header_list(self) -> List[Tuple[str, str]]:
+        return [
+            ('content-type', self.content_type),
+            ('content-length', str(len(self.body))),
+            *self.headers.items(),
+        ]
+
+    def encode(self, keep_alive: bool) -> bytes:
+        """Serialize as an HTTP/1.1 response"""
+        lines = [f"HTTP/1.1 {self.status} {HTTPStatus(self.status).phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in self.header_list())
+        lines.append(f"connection: {'keep-alive' if keep_alive else 'close'}")
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + self.body
+
+
+class RenderService:
+    """Render documents for posted configurations with one warm TemplateProcessor
+
+    Parsing, validation and rendering run on a pool of `workers` threads that
+    share the processor; its compiled templates are read-only once warmed.
+    At most workers + max_queue renders are accepted at a time, and each must
+    finish within `timeout` seconds. A timed-out render that has already
+    started runs to completion in the background and still holds its slot.
+    """
+
+    def __init__(
+        self,
+        processor: TemplateProcessor,
+        workers: int = 4,
+        max_queue: int = 16,
+        timeout: float = 10.0,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+    ):
+        self.processor = processor
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.capacity = workers + max_queue
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='render'
+        )
+        # Renders submitted to the executor and not yet finished
+        self.pending = 0
+        self.stats = {'rendered': 0, 'rejected': 0, 'timed_out': 0}
+        # Templates each standard tier always renders
+        self.tier_templates = {
+            tier: [
+                spec.name
+                for spec in processor.registry.specs.values()
+                if tier in spec.tiers
+            ]
+            for tier in VALID_TIERS
+            if tier != 'custom'
+        }
+
+    def warm(self) -> None:
+        """Compile every registered template up front, so no request pays for it"""
+        self.processor.warm_templates(sorted(self.processor.registry.by_name))
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+    async def handle(
+        self, method: str, target: str, headers: Dict[str, str], body: bytes
+    ) -> Response:
+        """Route one request; headers are keyed by lower-case name"""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+
+        if url.path == '/health':
+            health = {
+                'status': 'ok',
+                'pending': self.pending,
+                'capacity': self.capacity,
+                **self.stats,
+            }
+            if self.processor.render_cache is not None:
+                health['render_cache'] = self.processor.render_cache.stats
+            health['fragment_cache'] = self.processor.fragment_cache.stats
+            return Response.json(200, health)
+        if url.path == '/templates':
+            return Response.json(
+                200,
+                {
+                    'tiers': self.tier_templates,
+                    'templates': {
+                        key: spec.to_dict()
+                        for key, spec in self.processor.registry.specs.items()
+                    },
+                },
+            )
+        if url.path != '/render':
+            return Response.error(404, f"Not found: {url.path}")
+        if method != 'POST':
+            return Response(
+                405, b'{"error": "Use POST to render"}', headers={'allow': 'POST'}
+            )
+
+        if self.pending >= self.capacity:
+            self.stats['rejected'] += 1
+            return Response(
+                503, b'{"error": "Render queue is full"}', headers={'retry-after': '1'}
+            )
+
+        as_zip = (
+            query.get('format', [''])[0] == 'zip'
+            or 'application/zip' in headers.get('accept', '')
+        )
+        only = [
+            name
+            for value in query.get('templates', [])
+            for name in value.split(',')
+            if name
+        ]
+        content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        future = self.executor.submit(
+            self.render_request, body, content_type, only, as_zip
+        )
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._render_finished)
+        )
+        try:
+            response = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats['timed_out'] += 1
+            return Response.error(
+                504, f"Render did not finish within {self.timeout:g}s"
+            )
+        if response.status == 200:
+            self.stats['rendered'] += 1
+        return response
+
+    def _render_finished(self) -> None:
+        self.pending -= 1
+
+    def render_request(
+        self, body: bytes, content_type: str, only: List[str], as_zip: bool
+    ) -> Response:
+        """Parse, validate and render one request's config; runs on the executor"""
+        start = time.perf_counter()
+        try:
+            config = (
+                json.loads(body)
+                if content_type == JSON_CONTENT_TYPE
+                else load_yaml(body)
+            )
+        except Exception as e:
+            return Response.error(400, f"Invalid configuration document: {e}")
+        if not isinstance(config, dict):
+            return Response.error(400, "Configuration must be a mapping")
+
+        try:
+            self.processor.validate_config(config)
+        except ConfigValidationError as e:
+            return Response.error(
+                422, str(e), issues=[issue.to_dict() for issue in e.issues]
+            )
+        except ConfigError as e:
+            return Response.error(422, str(e))
+
+        plan = self.processor.render_plan(config)
+        template_names = plan.names
+        unknown = sorted(set(only) - set(template_names))
+        if unknown:
+            return Response.error(
+                400,
+                f"Templates not rendered for tier {config['tier']}: "
+                f"{', '.join(unknown)}",
+            )
+        if only:
+            template_names = [name for name in template_names if name in only]
+
+        documents: Dict[str, str] = {}
+        errors: Dict[str, str] = {
+            name: reason
+            for name, reason in plan.skipped.items()
+            if not only or name in only
+        }
+        context = self.processor.render_context(config, plan)
+        for template_name in template_names:
+            result = self.processor.render_job(0, template_name, context)
+            if result.error:
+                errors[template_name] = result.error
+            elif result.content:
+                documents[self.processor._output_name(template_name)] = result.content
+
+        if as_zip:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for filename, content in documents.items():
+                    archive.writestr(filename, content)
+                if errors:
+                    archive.writestr('errors.json', json.dumps(errors, indent=2))
+            return Response(200, buffer.getvalue(), 'application/zip', {
+                'content-disposition': 'attachment; filename="documents.zip"',
+                'x-render-errors': str(len(errors)),
+            })
+        return Response.json(
+            200,
+            {
+                'tier': config['tier'],
+                'documents': documents,
+                'errors': errors,
+                'seconds': time.perf_counter() - start,
+            },
+        )
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        """ASGI entry point"""
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    self.close()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if len(body) > self.max_body_bytes:
+                response = Response.error(
+                    413, f"Request body exceeds {self.max_body_bytes} bytes"
+                )
+                break
+        else:
+            headers = {
+                name.decode('latin-1').lower(): value.decode('latin-1')
+                for name, value in scope['headers']
+            }
+            target = scope['path']
+            if scope.get('query_string'):
+                target += '?' + scope['query_string'].decode('latin-1')
+            response = await self.handle(scope['method'], target, headers, bytes(body))
+
+        await send({'type': 'http.response.start', 'status': response.status,
+                    'headers': [(name.encode('latin-1'), value.encode('latin-1'))
+                                for name, value in response.header_list()]})
+        await send({'type': 'http.response.body', 'body': response.body})
+
+    async def serve(self, host: str, port: int) -> None:
+        """Serve HTTP/1.1 with keep-alive on the built-in asyncio server
+
+        Runs until the task is cancelled.
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                if isinstance(body, Response):
+                    response, keep_alive = body, False
+                else:
+                    response = await self.handle(method, target, headers, body)
+                    keep_alive = (
+                        version == 'HTTP/1.1'
+                        and headers.get('connection', '').lower() != 'close'
+                    )
+                writer.write(response.encode(keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (
+            ConnectionError,
+            asyncio.IncompleteReadError,
+            asyncio.TimeoutError,
+            ValueError,
+        ):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[tuple]:
+        """Read one request, or None when the client closed an idle connection
+
+        The body is a Response instead of bytes when the request must be
+        refused before it is read: a malformed request line, header or
+        Content-Length gets a 400. A client that sends nothing for `timeout`
+        seconds, even between keep-alive requests, is disconnected.
+        """
+        request_line = await asyncio.wait_for(reader.readline(), self.timeout)
+        if not request_line.strip():
+            return None
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            return '', '', 'HTTP/1.0', {}, Response.error(400, "Malformed request line")
+        method, target, version = parts
+        headers: Dict[str, str] = {}
+        malformed = False
+        while True:
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, colon, value = line.decode('latin-1').partition(':')
+            malformed = malformed or not colon or not name.strip()
+            headers[name.strip().lower()] = value.strip()
+
+        def refuse(status: int, message: str) -> tuple:
+            return method, target, version, headers, Response.error(status, message)
+
+        if malformed:
+            return refuse(400, "Malformed header line")
+        if 'transfer-encoding' in headers:
+            return refuse(411, "Send a Content-Length body")
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return refuse(400, f"Invalid Content-Length: {headers['content-length']}")
+        if length > self.max_body_bytes:
+            return refuse(413, f"Request body exceeds {self.max_body_bytes} bytes")
+        body = b''
+        if length:
+            body = await asyncio.wait_for(reader.readexactly(length), self.timeout)
+        return method, target, version, headers, body
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True,
+              help='Address to listen on')
+@click.option('--port', '-p', default=DEFAULT_PORT, show_default=True,
+              help='Port to listen on')
+@click.option('--workers', '-w', default=4, type=click.IntRange(min=1),
+              show_default=True, help='Render threads sharing the warm processor')
+@click.option('--max-queue', default=16, type=click.IntRange(min=0), show_default=True,
+              help='Renders allowed to wait for a thread before requests get 503')
+@click.option('--timeout', default=10.0, show_default=True,
+              help='Per-request render timeout in seconds')
+@click.option('--max-body-size', default=DEFAULT_MAX_BODY_BYTES // (1024 * 1024),
+              type=click.IntRange(min=1), show_default=True,
+              help='Largest accepted config in MB')
+@click.option('--render-cache', is_flag=True,
+              help='Keep rendered documents in memory and reuse them for configs with '
+                   'the same template inputs')
+@click.option('--bundle', type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help='Load precompiled templates from a bundle built with '
+                   'process_templates.py --build-bundle')
+@click.option('--server', type=click.Choice(['builtin', 'uvicorn']), default='builtin',
+              show_default=True,
+              help='HTTP server: the built-in asyncio server, or uvicorn if installed')
+def main(
+    host: str,
+    port: int,
+    workers: int,
+    max_queue: int,
+    timeout: float,
+    max_body_size: int,
+    render_cache: bool,
+    bundle: Optional[Path],
+    server: str,
+):
+    """Serve Stable Flow document rendering over HTTP"""
+    try:
+        processor = TemplateProcessor(
+            Path.cwd(), render_cache=render_cache, template_bundle=bundle
+        )
+    except ConfigError as e:
+        raise click.ClickException(str(e)) from None
+    service = RenderService(
+        processor, workers, max_queue, timeout, max_body_size * 1024 * 1024
+    )
+    start = time.perf_counter()
+    service.warm()
+    click.echo(
+        f"Compiled templates in {time.perf_counter() - start:.3f}s; "
+        f"serving on http://{host}:{port}"
+    )
+
+    if server == 'uvicorn':
+        try:
+            import uvicorn
+        except ImportError:
+            raise click.ClickException(
+                "uvicorn is not installed (pip install uvicorn), use --server builtin"
+            )
+        uvicorn.run(service, host=host, port=port, log_level='warning')
+        return
+
+    try:
+        asyncio.run(service.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -101,7 +101,4 @@ setup(
         'pytest>=7.0.0',
         'pytest-cov>=4.0.0',
     ],
-)</content>
-</xai:function_call name="write">
-<parameter name="file_path">pyproject.toml
-
+)
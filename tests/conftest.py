@@ -0,0 +1,23 @@
+"""Shared fixtures for the Stable Flow test suite"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# The engine lives in scripts/ as standalone modules rather than a package
+sys.path.insert(0, str(PROJECT_ROOT / 'scripts'))
+
+
+@pytest.fixture(scope='session')
+def project_root() -> Path:
+    return PROJECT_ROOT
+
+
+@pytest.fixture
+def processor(project_root):
+    from process_templates import TemplateProcessor
+
+    return TemplateProcessor(project_root)
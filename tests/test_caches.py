@@ -0,0 +1,133 @@
+"""Tests for the configuration and render caches"""
+
+import os
+
+import process_templates
+from process_templates import ConfigCache, RenderCache
+
+
+def disk_bytes(directory, pattern):
+    return sum(path.stat().st_size for path in directory.glob(pattern % '*'))
+
+
+class TestConfigCache:
+    def write_config(self, path, name):
+        path.write_text(f"project:\n  name: {name}\n", encoding='utf-8')
+        return path.read_bytes()
+
+    def test_repeat_load_skips_parsing(self, tmp_path, monkeypatch):
+        config_path = tmp_path / 'project.yaml'
+        data = self.write_config(config_path, 'Alpha')
+        cache = ConfigCache(tmp_path / 'cache')
+        assert cache.load(config_path, data) == {'project': {'name': 'Alpha'}}
+
+        def fail(data):
+            raise AssertionError("cached config was parsed again")
+
+        monkeypatch.setattr(process_templates, 'load_yaml', fail)
+        assert cache.load(config_path, data) == {'project': {'name': 'Alpha'}}
+        # A new cache on the same directory reads the stored entry
+        assert ConfigCache(tmp_path / 'cache').load(config_path, data) == {
+            'project': {'name': 'Alpha'}
+        }
+
+    def test_edited_file_is_parsed_again(self, tmp_path):
+        config_path = tmp_path / 'project.yaml'
+        cache = ConfigCache(tmp_path / 'cache')
+        cache.load(config_path, self.write_config(config_path, 'Alpha'))
+
+        data = self.write_config(config_path, 'Beta')
+        assert cache.load(config_path, data) == {'project': {'name': 'Beta'}}
+
+    def test_touched_file_gets_a_new_entry(self, tmp_path):
+        config_path = tmp_path / 'project.yaml'
+        data = self.write_config(config_path, 'Alpha')
+        cache = ConfigCache(tmp_path / 'cache')
+        cache.load(config_path, data)
+        stat = config_path.stat()
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert cache.load(config_path, data) == {'project': {'name': 'Alpha'}}
+        assert len(list((tmp_path / 'cache').glob(ConfigCache.PATTERN % '*'))) == 2
+
+    def test_store_is_capped_at_max_bytes(self, tmp_path):
+        directory = tmp_path / 'cache'
+        config_path = tmp_path / 'project.yaml'
+        probe = ConfigCache(tmp_path / 'probe')
+        probe.load(config_path, self.write_config(config_path, 'Name 0'))
+        entry_bytes = disk_bytes(tmp_path / 'probe', ConfigCache.PATTERN)
+
+        cache = ConfigCache(directory, max_bytes=entry_bytes * 3)
+        for index in range(10):
+            data = self.write_config(config_path, f"Name {index}")
+            cache.load(config_path, data)
+            assert disk_bytes(directory, ConfigCache.PATTERN) <= entry_bytes * 3
+        # The latest entry survives eviction
+        assert cache.load(config_path, data) == {'project': {'name': 'Name 9'}}
+        assert len(list(directory.glob(ConfigCache.PATTERN % '*'))) == 3
+
+    def test_clear(self, tmp_path):
+        config_path = tmp_path / 'project.yaml'
+        cache = ConfigCache(tmp_path / 'cache')
+        cache.load(config_path, self.write_config(config_path, 'Alpha'))
+        cache.clear()
+        assert not list((tmp_path / 'cache').iterdir())
+
+
+class TestRenderCache:
+    def test_memory_hit_and_miss(self):
+        cache = RenderCache()
+        assert cache.get('a') is None
+        cache.put('a', 'document')
+        assert cache.get('a') == 'document'
+        assert cache.stats == {'memory_hits': 1, 'disk_hits': 0, 'misses': 1}
+        assert cache.hits == 1
+
+    def test_memory_evicts_least_recently_used(self):
+        cache = RenderCache(memory_max_bytes=100)
+        for key in 'abcde':
+            cache.put(key, key * 20)
+        # Using a moves it ahead of b, which is evicted instead
+        cache.get('a')
+        cache.put('f', 'f' * 20)
+        assert cache.get('a') == 'a' * 20
+        assert cache.get('b') is None
+        assert cache._memory_bytes <= 100
+
+    def test_large_documents_are_not_kept(self):
+        cache = RenderCache(memory_max_bytes=100)
+        cache.put('big', 'x' * 26)
+        assert cache.get('big') is None
+
+    def test_replacing_an_entry_keeps_the_size_count(self):
+        cache = RenderCache(memory_max_bytes=100)
+        cache.put('a', 'x' * 20)
+        cache.put('a', 'y' * 10)
+        assert cache._memory_bytes == 10
+        assert cache.get('a') == 'y' * 10
+
+    def test_disk_store_outlives_the_process_cache(self, tmp_path):
+        RenderCache(tmp_path).put('a', 'document')
+        cache = RenderCache(tmp_path)
+        assert cache.get('a') == 'document'
+        assert cache.get('a') == 'document'
+        assert cache.stats == {'memory_hits': 1, 'disk_hits': 1, 'misses': 0}
+
+    def test_disk_store_is_capped_at_max_bytes(self, tmp_path):
+        cache = RenderCache(tmp_path, max_bytes=50)
+        for key in 'abcdef':
+            cache.put(key, key * 20)
+            assert disk_bytes(tmp_path, RenderCache.PATTERN) <= 50
+        assert (tmp_path / (RenderCache.PATTERN % 'f')).exists()
+
+    def test_merge_stats(self):
+        cache = RenderCache()
+        cache.merge_stats({'memory_hits': 2, 'misses': 3})
+        assert cache.stats == {'memory_hits': 2, 'disk_hits': 0, 'misses': 3}
+
+    def test_clear(self, tmp_path):
+        cache = RenderCache(tmp_path)
+        cache.put('a', 'document')
+        cache.clear()
+        assert cache.get('a') is None
+        assert not list(tmp_path.glob(RenderCache.PATTERN % '*'))
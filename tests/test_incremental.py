@@ -0,0 +1,189 @@
+"""Tests for incremental runs and stale output pruning"""
+
+import json
+import shutil
+
+import pytest
+
+from process_templates import (
+    MANIFEST_NAME, OUTPUTS_LEDGER_NAME, OutputWriter, RenderManifest,
+)
+
+DOCUMENTS = [
+    'features-csv-template.csv',
+    'prd-template.md',
+    'technical-design-template.md',
+]
+
+
+@pytest.fixture
+def config_path(tmp_path, project_root):
+    path = tmp_path / 'minimal.yaml'
+    shutil.copy(project_root / 'examples' / 'minimal-project-config.yaml', path)
+    return path
+
+
+def generate(processor, config_path, output_root):
+    result, = processor.generate_many([config_path], output_root, incremental=True)
+    assert result.ok, result.error
+    return result
+
+
+def names(paths):
+    return sorted(path.name for path in paths)
+
+
+class TestIncrementalRun:
+    def test_unchanged_inputs_are_not_rendered_again(
+        self, processor, config_path, tmp_path
+    ):
+        first = generate(processor, config_path, tmp_path / 'out')
+        assert names(first.documents) == DOCUMENTS
+        assert (tmp_path / 'out' / 'minimal' / MANIFEST_NAME).is_file()
+
+        second = generate(processor, config_path, tmp_path / 'out')
+        assert second.documents == []
+        assert names(second.up_to_date) == DOCUMENTS
+        assert second.output_stats == {'written': 0, 'unchanged': 3, 'removed': 0}
+
+    def test_only_documents_reading_a_changed_value_are_rendered(
+        self, processor, config_path, tmp_path
+    ):
+        generate(processor, config_path, tmp_path / 'out')
+        config_path.write_text(
+            config_path.read_text(encoding='utf-8').replace(
+                'My Minimal Project', 'Renamed Project'
+            ),
+            encoding='utf-8',
+        )
+
+        result = generate(processor, config_path, tmp_path / 'out')
+        assert names(result.documents) == [
+            'prd-template.md', 'technical-design-template.md'
+        ]
+        assert names(result.up_to_date) == ['features-csv-template.csv']
+        prd = tmp_path / 'out' / 'minimal' / 'prd-template.md'
+        assert 'Renamed Project' in prd.read_text(encoding='utf-8')
+
+    def test_deleted_document_is_rendered_again(
+        self, processor, config_path, tmp_path
+    ):
+        generate(processor, config_path, tmp_path / 'out')
+        (tmp_path / 'out' / 'minimal' / 'prd-template.md').unlink()
+
+        result = generate(processor, config_path, tmp_path / 'out')
+        assert names(result.documents) == ['prd-template.md']
+        assert (tmp_path / 'out' / 'minimal' / 'prd-template.md').is_file()
+
+    def test_outputs_no_longer_rendered_are_pruned(
+        self, processor, config_path, tmp_path
+    ):
+        generate(processor, config_path, tmp_path / 'out')
+        output_dir = tmp_path / 'out' / 'minimal'
+        # A document of a template an earlier run rendered, and a user's file
+        (output_dir / 'adr-template.md').write_text('old', encoding='utf-8')
+        ledger = json.loads((output_dir / OUTPUTS_LEDGER_NAME).read_text())
+        ledger['outputs'].append('adr-template.md')
+        (output_dir / OUTPUTS_LEDGER_NAME).write_text(json.dumps(ledger))
+        (output_dir / 'notes.md').write_text('mine', encoding='utf-8')
+
+        result = generate(processor, config_path, tmp_path / 'out')
+        assert names(result.removed) == ['adr-template.md']
+        assert result.output_stats['removed'] == 1
+        assert not (output_dir / 'adr-template.md').exists()
+        assert (output_dir / 'notes.md').is_file()
+
+
+class TestRenderManifest:
+    def test_fresh_only_with_the_same_fingerprint_and_output(self, tmp_path):
+        output_path = tmp_path / 'doc.md'
+        output_path.write_text('document', encoding='utf-8')
+        manifest = RenderManifest(tmp_path)
+        manifest.record('doc', {'template': 'a'}, output_path)
+        manifest.save()
+
+        manifest = RenderManifest(tmp_path)
+        assert manifest.is_fresh('doc', {'template': 'a'}, output_path)
+        assert not manifest.is_fresh('doc', {'template': 'b'}, output_path)
+        assert not manifest.is_fresh('other', {'template': 'a'}, output_path)
+        output_path.unlink()
+        assert not manifest.is_fresh('doc', {'template': 'a'}, output_path)
+
+    def test_entries_not_kept_drop_out(self, tmp_path):
+        output_path = tmp_path / 'doc.md'
+        manifest = RenderManifest(tmp_path)
+        manifest.record('doc', {'template': 'a'}, output_path)
+        manifest.save()
+
+        RenderManifest(tmp_path).save()
+        assert RenderManifest(tmp_path).previous == {}
+
+    def test_unreadable_manifest_is_ignored(self, tmp_path):
+        (tmp_path / MANIFEST_NAME).write_text('{not json', encoding='utf-8')
+        assert RenderManifest(tmp_path).previous == {}
+        (tmp_path / MANIFEST_NAME).write_text(
+            json.dumps({'version': -1, 'documents': {'doc': {}}}), encoding='utf-8'
+        )
+        assert RenderManifest(tmp_path).previous == {}
+
+
+class TestOutputWriter:
+    def test_identical_bytes_leave_the_file_untouched(self, tmp_path):
+        writer = OutputWriter(tmp_path)
+        path = writer.write('doc.md', b'document')
+        mtime = path.stat().st_mtime_ns
+
+        writer = OutputWriter(tmp_path)
+        assert writer.write('doc.md', b'document') == path
+        assert writer.write_chunks('other.md', iter(['a', 'b'])) is not None
+        assert writer.write_chunks('empty.md', iter([])) is None
+        assert path.stat().st_mtime_ns == mtime
+        assert writer.stats == {'written': 1, 'unchanged': 1, 'removed': 0}
+        assert not (tmp_path / 'empty.md').exists()
+        assert not list(tmp_path.glob('.*.tmp'))
+
+    def test_prune_removes_only_unclaimed_ledger_entries(self, tmp_path):
+        writer = OutputWriter(tmp_path, prune=True)
+        writer.write('kept.md', b'kept')
+        writer.write('stale.md', b'stale')
+        writer.write('failed.md', b'failed')
+        writer.finish()
+        (tmp_path / 'notes.md').write_text('mine', encoding='utf-8')
+
+        writer = OutputWriter(tmp_path, prune=True)
+        writer.write('kept.md', b'kept')
+        writer.claim('failed.md')
+        writer.finish()
+        assert writer.removed == [tmp_path / 'stale.md']
+        assert sorted(path.name for path in tmp_path.glob('*.md')) == [
+            'failed.md', 'kept.md', 'notes.md'
+        ]
+        ledger = json.loads((tmp_path / OUTPUTS_LEDGER_NAME).read_text())
+        assert ledger == {'outputs': ['failed.md', 'kept.md']}
+
+    def test_without_prune_existing_outputs_stay_in_the_ledger(self, tmp_path):
+        writer = OutputWriter(tmp_path)
+        writer.write('a.md', b'a')
+        writer.write('b.md', b'b')
+        writer.finish()
+
+        writer = OutputWriter(tmp_path)
+        writer.write('a.md', b'a')
+        writer.finish()
+        assert (tmp_path / 'b.md').exists()
+        ledger = json.loads((tmp_path / OUTPUTS_LEDGER_NAME).read_text())
+        assert ledger == {'outputs': ['a.md', 'b.md']}
+
+    def test_ledger_names_outside_the_directory_are_never_deleted(self, tmp_path):
+        output_dir = tmp_path / 'out'
+        output_dir.mkdir()
+        outside = tmp_path / 'outside.md'
+        outside.write_text('keep', encoding='utf-8')
+        (output_dir / OUTPUTS_LEDGER_NAME).write_text(
+            json.dumps({'outputs': ['../outside.md']})
+        )
+
+        writer = OutputWriter(output_dir, prune=True)
+        writer.finish()
+        assert outside.exists()
+        assert writer.stats['removed'] == 0
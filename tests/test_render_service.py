@@ -0,0 +1,175 @@
+"""Tests for the render service's routing and error responses"""
+
+import asyncio
+import json
+
+import pytest
+import yaml
+
+from render_service import RenderService
+
+
+@pytest.fixture
+def service(processor):
+    service = RenderService(processor, workers=1, max_queue=0, timeout=5.0)
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def minimal_config(project_root):
+    return (project_root / 'examples' / 'minimal-project-config.yaml').read_bytes()
+
+
+def call(service, method, target, body=b'', headers=None):
+    response = asyncio.run(service.handle(method, target, headers or {}, body))
+    payload = json.loads(response.body) if response.content_type.endswith('json') \
+        else response.body
+    return response, payload
+
+
+def read_request(service, data):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await service._read_request(reader)
+
+    return asyncio.run(read())
+
+
+class TestHandle:
+    def test_render(self, service, minimal_config):
+        response, payload = call(service, 'POST', '/render', minimal_config)
+        assert response.status == 200
+        assert payload['tier'] == 'minimal'
+        assert 'prd-template.md' in payload['documents']
+        assert payload['errors'] == {}
+
+    def test_unknown_path(self, service):
+        response, payload = call(service, 'GET', '/missing')
+        assert response.status == 404
+        assert payload == {'error': 'Not found: /missing'}
+
+    def test_render_needs_post(self, service):
+        response, _ = call(service, 'GET', '/render')
+        assert response.status == 405
+        assert response.headers == {'allow': 'POST'}
+
+    def test_full_queue_is_refused(self, service, minimal_config):
+        service.pending = service.capacity
+        response, _ = call(service, 'POST', '/render', minimal_config)
+        assert response.status == 503
+        assert response.headers == {'retry-after': '1'}
+        assert service.stats['rejected'] == 1
+
+    @pytest.mark.parametrize('body, headers', [
+        (b'project: [unclosed', {}),
+        (b'{"project":', {'content-type': 'application/json'}),
+    ])
+    def test_unparsable_config(self, service, body, headers):
+        response, payload = call(service, 'POST', '/render', body, headers)
+        assert response.status == 400
+        assert payload['error'].startswith('Invalid configuration document')
+
+    def test_config_must_be_a_mapping(self, service):
+        response, payload = call(service, 'POST', '/render', b'- a list')
+        assert response.status == 400
+        assert payload == {'error': 'Configuration must be a mapping'}
+
+    def test_invalid_config_lists_its_issues(self, service, minimal_config):
+        config = yaml.safe_load(minimal_config)
+        del config['project']['name']
+        config['tier'] = 'unknown'
+        response, payload = call(
+            service, 'POST', '/render', json.dumps(config).encode('utf-8'),
+            {'content-type': 'application/json'},
+        )
+        assert response.status == 422
+        paths = {issue['path'] for issue in payload['issues']}
+        assert {'project.name', 'tier'} <= paths
+
+    def test_unknown_template_filter(self, service, minimal_config):
+        response, payload = call(
+            service, 'POST', '/render?templates=prd-template,adr', minimal_config
+        )
+        assert response.status == 400
+        assert payload['error'] == 'Templates not rendered for tier minimal: adr'
+
+    def test_render_timeout(self, service, minimal_config, monkeypatch):
+        import threading
+
+        release = threading.Event()
+        render = service.render_request
+
+        def slow(*args):
+            release.wait(5)
+            return render(*args)
+
+        monkeypatch.setattr(service, 'render_request', slow)
+        service.timeout = 0.05
+        try:
+            response, _ = call(service, 'POST', '/render', minimal_config)
+        finally:
+            release.set()
+        assert response.status == 504
+        assert service.stats['timed_out'] == 1
+
+
+class TestReadRequest:
+    def refusal(self, service, data):
+        *_, body = read_request(service, data)
+        return body.status, json.loads(body.body)['error']
+
+    def test_request_with_body(self, service):
+        method, target, version, headers, body = read_request(
+            service,
+            b'POST /render?format=zip HTTP/1.1\r\nContent-Type: text/yaml\r\n'
+            b'Content-Length: 5\r\n\r\ntier:',
+        )
+        assert (method, target, version) == ('POST', '/render?format=zip', 'HTTP/1.1')
+        assert headers == {'content-type': 'text/yaml', 'content-length': '5'}
+        assert body == b'tier:'
+
+    def test_closed_idle_connection(self, service):
+        assert read_request(service, b'') is None
+
+    def test_malformed_request_line(self, service):
+        assert self.refusal(service, b'GARBAGE\r\n\r\n') == (
+            400, 'Malformed request line'
+        )
+
+    def test_malformed_header(self, service):
+        assert self.refusal(
+            service, b'GET /health HTTP/1.1\r\nno colon here\r\n\r\n'
+        ) == (400, 'Malformed header line')
+
+    @pytest.mark.parametrize('length', [b'abc', b'-5'])
+    def test_invalid_content_length(self, service, length):
+        status, message = self.refusal(
+            service, b'POST /render HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n'
+        )
+        assert status == 400
+        assert message == f"Invalid Content-Length: {length.decode()}"
+
+    def test_chunked_body_is_refused(self, service):
+        assert self.refusal(
+            service, b'POST /render HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'
+        ) == (411, 'Send a Content-Length body')
+
+    def test_oversized_body_is_refused_unread(self, service):
+        service.max_body_bytes = 10
+        assert self.refusal(
+            service, b'POST /render HTTP/1.1\r\nContent-Length: 11\r\n\r\n'
+        ) == (413, 'Request body exceeds 10 bytes')
+
+    def test_silent_client_times_out(self, service):
+        service.timeout = 0.05
+
+        async def read():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b'POST /render HTTP/1.1\r\n')
+            return await service._read_request(reader)
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(read())
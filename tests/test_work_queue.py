@@ -0,0 +1,178 @@
+"""Tests for the fleet work queue, its leases and its TCP server"""
+
+import pytest
+
+import process_templates
+from process_templates import ConfigError, QueueServer, RemoteQueue, WorkQueue
+
+SETTINGS = {
+    'output_root': 'out',
+    'incremental': False,
+    'lease_seconds': 60,
+    'max_attempts': 2,
+}
+RESULT = {'seconds': 0.5}
+
+
+class Clock:
+    """Stands in for time.time, so leases expire without waiting"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(process_templates.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def queue():
+    queue = WorkQueue(':memory:')
+    queue.create([['a.yaml'], ['b.yaml', 'c.yaml']], SETTINGS)
+    yield queue
+    queue.close()
+
+
+class TestWorkQueue:
+    def test_units_are_claimed_once(self, queue, clock):
+        first = queue.claim('w1')
+        second = queue.claim('w2')
+        assert (first['id'], first['configs'], first['attempt']) == (1, ['a.yaml'], 1)
+        assert second['configs'] == ['b.yaml', 'c.yaml']
+        assert queue.claim('w3') is None
+        assert queue.counts() == {'pending': 0, 'leased': 2, 'done': 0, 'failed': 0}
+
+        assert queue.complete(first['id'], first['lease'], RESULT)
+        assert queue.complete(second['id'], second['lease'], RESULT)
+        assert queue.finished()
+
+    def test_expired_lease_is_claimed_again(self, queue, clock):
+        unit = queue.claim('w1')
+        queue.claim('w2')
+        clock.now += SETTINGS['lease_seconds'] + 1
+
+        retry = queue.claim('w3')
+        assert retry['id'] == unit['id']
+        assert retry['attempt'] == 2
+        # The stopped worker's lease is gone
+        assert not queue.renew(unit['id'], unit['lease'])
+        assert not queue.complete(unit['id'], unit['lease'], RESULT)
+        assert queue.complete(retry['id'], retry['lease'], RESULT)
+
+    def test_renew_extends_the_lease(self, queue, clock):
+        unit = queue.claim('w1')
+        queue.claim('w2')
+        clock.now += SETTINGS['lease_seconds'] - 1
+        assert queue.renew(unit['id'], unit['lease'])
+        clock.now += 2
+        assert queue.claim('w3')['id'] != unit['id']
+
+    def test_last_attempt_expiring_fails_the_unit(self, queue, clock):
+        queue.claim('w1')
+        queue.claim('w2')
+        clock.now += SETTINGS['lease_seconds'] + 1
+        queue.claim('w3')
+        queue.claim('w4')
+        clock.now += SETTINGS['lease_seconds'] + 1
+
+        assert queue.claim('w5') is None
+        assert queue.finished()
+        units = queue.units()
+        assert [unit['state'] for unit in units] == ['failed', 'failed']
+        assert units[0]['error'] == 'Lease of w3 expired'
+
+    def test_expire_without_claiming(self, queue, clock):
+        queue.claim('w1')
+        clock.now += SETTINGS['lease_seconds'] + 1
+        queue.expire()
+        assert queue.counts()['failed'] == 0
+        queue.claim('w2')
+        queue.claim('w3')
+        clock.now += SETTINGS['lease_seconds'] + 1
+        queue.expire()
+        assert queue.counts() == {'pending': 0, 'leased': 1, 'done': 0, 'failed': 1}
+
+    def test_failed_unit_is_retried_until_max_attempts(self, queue, clock):
+        unit = queue.claim('w1')
+        assert queue.fail(unit['id'], unit['lease'], 'boom', RESULT)
+        # New units are handed out before retries
+        assert queue.claim('w2')['id'] == 2
+
+        retry = queue.claim('w1')
+        assert (retry['id'], retry['attempt']) == (unit['id'], 2)
+        assert queue.fail(retry['id'], retry['lease'], 'boom again', RESULT)
+        failed = queue.units()[0]
+        assert (failed['state'], failed['attempts']) == ('failed', 2)
+        assert failed['error'] == 'boom again'
+        assert failed['result'] == RESULT
+
+    def test_create_replaces_the_run(self, queue):
+        queue.create([['d.yaml']], {**SETTINGS, 'max_attempts': 5})
+        assert [unit['configs'] for unit in queue.units()] == [['d.yaml']]
+        assert queue.meta()['max_attempts'] == 5
+
+    def test_settings_are_shared_through_the_file(self, tmp_path):
+        path = str(tmp_path / 'queue.db')
+        WorkQueue(path).create([['a.yaml']], SETTINGS)
+        worker = WorkQueue(path)
+        assert worker.meta() == SETTINGS
+        assert worker.claim('w1')['configs'] == ['a.yaml']
+
+
+class TestQueueServer:
+    def serve(self, queue, token=None):
+        server = QueueServer(queue, '127.0.0.1', 0, token=token)
+        server.start()
+        return server
+
+    def test_remote_worker_runs_a_unit(self, queue):
+        server = self.serve(queue)
+        remote = RemoteQueue(*server.address)
+        try:
+            assert remote.meta() == SETTINGS
+            unit = remote.claim('remote')
+            assert remote.complete(unit['id'], unit['lease'], RESULT)
+            assert remote.counts()['done'] == 1
+        finally:
+            remote.close()
+            server.close(grace_seconds=0)
+        assert queue.units()[0]['worker'] == 'remote'
+
+    def test_only_worker_operations_are_served(self, queue):
+        server = self.serve(queue)
+        remote = RemoteQueue(*server.address)
+        try:
+            with pytest.raises(ConfigError, match='Unknown operation: create'):
+                remote._call('create', [], {})
+        finally:
+            remote.close()
+            server.close(grace_seconds=0)
+
+    def test_token_is_checked(self, queue):
+        server = self.serve(queue, token='secret')
+        allowed = RemoteQueue(*server.address, token='secret')
+        refused = RemoteQueue(*server.address, token='guess')
+        anonymous = RemoteQueue(*server.address)
+        try:
+            assert allowed.counts()['pending'] == 2
+            with pytest.raises(ConfigError, match='wrong fleet queue token'):
+                refused.claim('intruder')
+            with pytest.raises(ConfigError, match='wrong fleet queue token'):
+                anonymous.claim('intruder')
+            assert queue.counts()['pending'] == 2
+        finally:
+            for remote in (allowed, refused, anonymous):
+                remote.close()
+            server.close(grace_seconds=0)
+
+    def test_public_address_requires_a_token(self, queue):
+        with pytest.raises(ConfigError, match=process_templates.QUEUE_TOKEN_ENV):
+            QueueServer(queue, '0.0.0.0', 0)
+        server = QueueServer(queue, '0.0.0.0', 0, token='secret')
+        server.close(grace_seconds=0)